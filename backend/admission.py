@@ -0,0 +1,173 @@
+"""Admission control and load shedding for the API endpoints.
+
+Each endpoint gets a concurrency limit and a bounded wait queue, and all
+endpoints draw from one shared pool of slots. When a slot frees up, waiting
+requests are admitted in priority order, so cheap /api/search calls move
+ahead of expensive /api/ocr work, and among equal priorities the client
+with the fewest requests in flight goes first. Requests that cannot be
+admitted fail fast with 429 (client over its fair share while the server is
+contended) or 503 (endpoint saturated), both with a Retry-After header,
+instead of piling up until clients time out.
+"""
+import asyncio
+import bisect
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+SERVICE_TIME_ALPHA = 0.2
+
+
+class EndpointLimit:
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, priority: int, initial_service_time: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        # Lower number = admitted first when slots are contended
+        self.priority = priority
+        self.service_time = initial_service_time
+
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+
+class _Waiter:
+    def __init__(self, priority: int, seq: int, limit: EndpointLimit, client: str, future: asyncio.Future):
+        self.key = (priority, seq)
+        self.limit = limit
+        self.client = client
+        self.future = future
+
+    def __lt__(self, other: '_Waiter') -> bool:
+        return self.key < other.key
+
+
+class AdmissionController:
+    def __init__(self, total_slots: int, per_client_limit: int, queue_timeout: float, limits: List[EndpointLimit]):
+        self.total_slots = total_slots
+        self.per_client_limit = per_client_limit
+        self.queue_timeout = queue_timeout
+        self.limits: Dict[str, EndpointLimit] = {limit.name: limit for limit in limits}
+
+        self.total_active = 0
+        self.client_inflight: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _can_run(self, limit: EndpointLimit) -> bool:
+        return limit.active < limit.max_concurrent and self.total_active < self.total_slots
+
+    def _retry_after(self, limit: EndpointLimit) -> int:
+        # Time for everything already queued ahead of us to drain
+        backlog = (limit.queued + limit.active + 1) / max(limit.max_concurrent, 1)
+        return max(1, math.ceil(backlog * limit.service_time))
+
+    def _reject(self, limit: EndpointLimit, status_code: int, detail: str) -> HTTPException:
+        limit.rejected += 1
+        return HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={"Retry-After": str(self._retry_after(limit))}
+        )
+
+    def _start(self, limit: EndpointLimit) -> None:
+        limit.active += 1
+        limit.admitted += 1
+        self.total_active += 1
+
+    def _release(self, limit: EndpointLimit, client: str, elapsed: Optional[float]) -> None:
+        limit.active -= 1
+        self.total_active -= 1
+        if elapsed is not None:
+            limit.service_time += SERVICE_TIME_ALPHA * (elapsed - limit.service_time)
+        self._leave(client)
+        self._dispatch()
+
+    def _leave(self, client: str) -> None:
+        remaining = self.client_inflight.get(client, 1) - 1
+        if remaining > 0:
+            self.client_inflight[client] = remaining
+        else:
+            self.client_inflight.pop(client, None)
+
+    def _dispatch(self) -> None:
+        """Admit waiters best-priority-first while slots are available; within
+        a priority, the client with the fewest requests in flight wins."""
+        while self.total_active < self.total_slots:
+            runnable = [w for w in self._waiters if not w.future.done() and self._can_run(w.limit)]
+            if not runnable:
+                return
+            waiter = min(runnable, key=lambda w: (w.key[0], self.client_inflight.get(w.client, 0), w.key[1]))
+            self._waiters.remove(waiter)
+            waiter.limit.queued -= 1
+            self._start(waiter.limit)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str, client: str):
+        limit = self.limits[endpoint]
+
+        # Waiters that could run are admitted on every release, so anything
+        # still queued for this endpoint is blocked; don't jump ahead of it.
+        if self._can_run(limit) and limit.queued == 0:
+            # Free capacity: no reason to hold anyone to a quota
+            self._start(limit)
+            self.client_inflight[client] = self.client_inflight.get(client, 0) + 1
+        elif self.client_inflight.get(client, 0) >= self.per_client_limit:
+            raise self._reject(limit, 429, "Too many concurrent requests from this client")
+        elif limit.queued >= limit.max_queue:
+            raise self._reject(limit, 503, "Server is busy, please retry later")
+        else:
+            waiter = _Waiter(limit.priority, next(self._seq), limit, client,
+                             asyncio.get_running_loop().create_future())
+            bisect.insort(self._waiters, waiter)
+            limit.queued += 1
+            self.client_inflight[client] = self.client_inflight.get(client, 0) + 1
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.future.done():
+                    # Admitted at the same moment we gave up; hand the slot back
+                    self._release(limit, client, None)
+                else:
+                    waiter.future.cancel()
+                    self._waiters.remove(waiter)
+                    limit.queued -= 1
+                    self._leave(client)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                limit.timed_out += 1
+                raise self._reject(limit, 503, "Server is busy, please retry later")
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._release(limit, client, time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        return {
+            'total_slots': self.total_slots,
+            'total_active': self.total_active,
+            'endpoints': [
+                {
+                    'name': limit.name,
+                    'active': limit.active,
+                    'queued': limit.queued,
+                    'max_concurrent': limit.max_concurrent,
+                    'max_queue': limit.max_queue,
+                    'service_time_ms': round(limit.service_time * 1000),
+                    'admitted': limit.admitted,
+                    'rejected': limit.rejected,
+                    'timed_out': limit.timed_out,
+                }
+                for limit in self.limits.values()
+            ],
+        }
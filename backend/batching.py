@@ -0,0 +1,116 @@
+"""Micro-batching of small, concurrent upstream calls.
+
+Requests run in worker threads. The first item to arrive opens a batch and
+waits up to `window` seconds for others to join (or until `max_batch` items
+are queued), then makes one upstream call for the whole batch and hands each
+caller its own slice of the answer. If the batched call fails or its answer
+cannot be split back out (or there was nobody to batch with), each caller
+that is still waiting makes its own single call on its own thread, so the
+fallbacks run in parallel and none of them holds up the thread that ran the
+batch. Callers can bound how long they wait for their result.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class _RunAlone(Exception):
+    """Set on a caller's future to tell it to make its own single call."""
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        single_fn: Callable[[Any], Any],
+        window: float,
+        max_batch: int,
+    ):
+        self.batch_fn = batch_fn
+        self.single_fn = single_fn
+        self.window = window
+        self.max_batch = max_batch
+
+        self._cond = threading.Condition()
+        self._pending: List[Tuple[Any, Future]] = []
+
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+        self.timeouts = 0
+
+    def _take(self) -> List[Tuple[Any, Future]]:
+        batch = self._pending[:self.max_batch]
+        self._pending = self._pending[self.max_batch:]
+        return batch
+
+    def submit(self, item: Any, timeout: Optional[float] = None) -> Any:
+        """Queue an item and block until its result is ready.
+
+        Raises TimeoutError if the result is not ready within `timeout`
+        seconds; the item is withdrawn if no batch has picked it up yet.
+        """
+        future: Future = Future()
+        batch = []
+        leader = False
+
+        with self._cond:
+            self._pending.append((item, future))
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+                self._cond.notify_all()
+            elif len(self._pending) == 1:
+                leader = True
+
+        if leader:
+            with self._cond:
+                self._cond.wait_for(lambda: not self._pending or len(self._pending) >= self.max_batch,
+                                    timeout=self.window)
+                batch = self._take()
+
+        if batch:
+            self._run(batch)
+
+        try:
+            return future.result(timeout)
+        except _RunAlone:
+            return self.single_fn(item)
+        except TimeoutError:
+            with self._cond:
+                self._pending = [(i, f) for i, f in self._pending if f is not future]
+                self.timeouts += 1
+            raise
+
+    def _run(self, batch: List[Tuple[Any, Future]]) -> None:
+        items = [item for item, _ in batch]
+
+        with self._cond:
+            self.batches += 1
+            self.items += len(items)
+
+        if len(items) > 1:
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise ValueError(f"expected {len(items)} results, got {len(results)}")
+            except Exception as e:
+                print(f"Batched call for {len(items)} items failed, falling back to single calls: {e}")
+                with self._cond:
+                    self.fallbacks += 1
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                return
+
+        for _, future in batch:
+            future.set_exception(_RunAlone())
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                'batches': self.batches,
+                'items': self.items,
+                'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0,
+                'fallbacks': self.fallbacks,
+                'timeouts': self.timeouts,
+            }
@@ -0,0 +1,107 @@
+"""Cold-start benchmark for the Halo Trace backend.
+
+Reports two numbers:
+  * import time of `main`, from `python -X importtime`, with the slowest
+    modules listed so regressions in lazy loading are easy to spot
+  * time-to-first-/health: wall time from launching uvicorn until the
+    health check answers 200
+
+Usage:
+    cd backend
+    python bench_startup.py [--runs 5] [--port 8765] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$')
+
+
+def measure_import_time():
+    """Return (total_us, [(cumulative_us, module), ...]) for `import main`."""
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import main failed:\n{proc.stderr}")
+
+    modules = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us = int(match.group(2))
+        module = match.group(4).strip()
+        modules.append((cumulative_us, module))
+        if module == 'main':
+            total_us = cumulative_us
+
+    modules.sort(reverse=True)
+    return total_us, modules
+
+
+def measure_time_to_health(port: int, timeout: float = 120.0) -> float:
+    """Launch uvicorn and return seconds until /health answers 200."""
+    url = f"http://127.0.0.1:{port}/health"
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.02)
+        raise RuntimeError(f"/health did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure backend cold-start time")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to list")
+    args = parser.parse_args()
+
+    import_totals = []
+    modules = []
+    for _ in range(args.runs):
+        total_us, modules = measure_import_time()
+        import_totals.append(total_us)
+
+    print(f"import main: median {statistics.median(import_totals) / 1000:.1f} ms over {args.runs} runs")
+    print("slowest imports (cumulative, last run):")
+    for cumulative_us, module in modules[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {module}")
+
+    health_times = [measure_time_to_health(args.port) for _ in range(args.runs)]
+    print(f"time to first /health: median {statistics.median(health_times) * 1000:.0f} ms, "
+          f"max {max(health_times) * 1000:.0f} ms over {args.runs} runs")
+
+
+if __name__ == "__main__":
+    main()
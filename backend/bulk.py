@@ -0,0 +1,217 @@
+"""Offline bulk processing for archived images and name lists.
+
+Runs the same pipeline as the API (process_image / find_linkedin_profile)
+across worker processes and streams one JSON line per input to the output
+file. The output file doubles as the checkpoint: rerunning the same command
+skips every input that already has a successful record.
+
+Usage:
+    cd backend
+    python bulk.py images ./archive --tag companies --out images.jsonl
+    python bulk.py names speakers.csv --tag people --column name --out people.jsonl
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, List, Set
+
+import main
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp', '.bmp', '.gif', '.tif', '.tiff'}
+
+
+def list_images(directory: Path) -> List[str]:
+    return sorted(
+        str(path) for path in directory.rglob('*')
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def read_names(csv_path: Path, column: str) -> List[str]:
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        rows = list(reader)
+
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if column.lower() in header:
+        index = header.index(column.lower())
+        rows = rows[1:]
+    else:
+        # No header row: take the first column
+        index = 0
+
+    names = []
+    for row in rows:
+        if index < len(row) and row[index].strip():
+            names.append(row[index].strip())
+    return names
+
+
+def load_completed(out_path: Path) -> Set[str]:
+    """Inputs that already have a successful record in the output file."""
+    completed = set()
+    if not out_path.exists():
+        return completed
+
+    with open(out_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from an interrupted run
+                continue
+            if record.get('ok'):
+                completed.add(record['input'])
+    return completed
+
+
+def process_image_task(args) -> dict:
+    path, tag = args
+    start = time.perf_counter()
+    try:
+        contents = Path(path).read_bytes()
+        result = main.process_image(contents, tag)
+        # Partial results (a lookup that errored out) are retried next run
+        return {'input': path, 'ok': not result['partial'], 'result': result,
+                'elapsed_ms': round((time.perf_counter() - start) * 1000)}
+    except Exception as e:
+        return {'input': path, 'ok': False, 'error': str(e),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000)}
+
+
+def process_name_task(args) -> dict:
+    name, tag = args
+    start = time.perf_counter()
+    try:
+        result = main.find_linkedin_profile(name, tag)
+        # An incomplete search (every query errored) is retried next run
+        return {'input': name, 'ok': result['complete'], 'result': result,
+                'elapsed_ms': round((time.perf_counter() - start) * 1000)}
+    except Exception as e:
+        return {'input': name, 'ok': False, 'error': str(e),
+                'elapsed_ms': round((time.perf_counter() - start) * 1000)}
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m{secs:02d}s"
+    return f"{minutes}m{secs:02d}s"
+
+
+class Progress:
+    def __init__(self, total: int, interval: float = 1.0):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+        self.last_print = 0.0
+
+    def update(self, ok: bool) -> None:
+        self.done += 1
+        if not ok:
+            self.failed += 1
+        now = time.perf_counter()
+        if now - self.last_print >= self.interval or self.done == self.total:
+            self.last_print = now
+            self.print(now)
+
+    def print(self, now: float) -> None:
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = (self.total - self.done) / rate if rate > 0 else 0.0
+        print(f"\r{self.done}/{self.total} done, {self.failed} failed, "
+              f"{rate:.2f}/s, elapsed {format_duration(elapsed)}, ETA {format_duration(eta)}   ",
+              end='', file=sys.stderr, flush=True)
+
+
+def init_worker() -> None:
+    # Torch would otherwise start one thread per core in every worker
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(int(os.getenv('TORCH_THREADS_PER_WORKER', '1')))
+    # Each worker handles one input at a time, so a Haiku call would only
+    # wait out the batching window for partners that never arrive
+    os.environ['LLM_BATCH_WINDOW_MS'] = '0'
+
+
+def run(task, inputs: Iterable[str], tag: str, out_path: Path, workers: int, restart: bool) -> int:
+    inputs = list(dict.fromkeys(inputs))
+    if restart and out_path.exists():
+        out_path.unlink()
+
+    completed = load_completed(out_path)
+    pending = [item for item in inputs if item not in completed]
+    print(f"{len(inputs)} inputs, {len(inputs) - len(pending)} already done, "
+          f"{len(pending)} to process with {workers} workers", file=sys.stderr)
+    if not pending:
+        return 0
+
+    # Fork so model weights preloaded here are shared with the workers
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+    progress = Progress(len(pending))
+    with open(out_path, 'a+', encoding='utf-8') as out:
+        # Finish a torn line left by an interrupted run before appending
+        if out.tell() > 0:
+            out.seek(out.tell() - 1)
+            if out.read(1) != '\n':
+                out.write('\n')
+
+        with context.Pool(processes=workers, initializer=init_worker) as pool:
+            try:
+                for record in pool.imap_unordered(task, [(item, tag) for item in pending]):
+                    out.write(json.dumps(record) + '\n')
+                    out.flush()
+                    progress.update(record['ok'])
+            except KeyboardInterrupt:
+                pool.terminate()
+                print("\nInterrupted; rerun the same command to resume.", file=sys.stderr)
+                return 130
+
+    print(file=sys.stderr)
+    return 1 if progress.failed else 0
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk-process images or name lists offline")
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+
+    images = subparsers.add_parser('images', help="extract names from every image in a directory")
+    images.add_argument('directory', type=Path)
+
+    names = subparsers.add_parser('names', help="look up LinkedIn profiles for names in a CSV")
+    names.add_argument('csv', type=Path)
+    names.add_argument('--column', default='name', help="CSV column holding the names (default: name)")
+
+    for sub in (images, names):
+        sub.add_argument('--tag', choices=['companies', 'people'], default='companies')
+        sub.add_argument('--out', type=Path, required=True, help="JSONL output, also used as the checkpoint")
+        sub.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        sub.add_argument('--restart', action='store_true', help="ignore existing output and start over")
+
+    args = parser.parse_args(argv)
+
+    if args.mode == 'images':
+        inputs = list_images(args.directory)
+        main.preload_models()
+        return run(process_image_task, inputs, args.tag, args.out, args.workers, args.restart)
+
+    inputs = read_names(args.csv, args.column)
+    return run(process_name_task, inputs, args.tag, args.out, args.workers, args.restart)
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
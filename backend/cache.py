@@ -0,0 +1,132 @@
+"""Cross-process cache backed by SQLite in WAL mode.
+
+Every worker process opens its own connection to the same database file, so
+LinkedIn lookups and image results computed by one worker are visible to all
+of them. WAL mode lets readers proceed while another worker is writing.
+Expired rows are purged by the first write in each process and then at most
+once every PURGE_INTERVAL_SECONDS, whatever the entry point.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / 'cache.sqlite3'
+PURGE_INTERVAL_SECONDS = 3600.0
+
+
+class SharedCache:
+    """Key/value store shared by all worker processes on one host."""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._last_purge = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections must never cross a fork or a thread boundary, so keep
+        # one per thread and reopen it if we find ourselves in a new process.
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS cache ('
+                    ' namespace TEXT NOT NULL,'
+                    ' key TEXT NOT NULL,'
+                    ' value TEXT NOT NULL,'
+                    ' stored_at REAL NOT NULL,'
+                    ' PRIMARY KEY (namespace, key))'
+                )
+                self._initialized = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def get_entry(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, stored_at) for a fresh entry, or None."""
+        try:
+            row = self._connect().execute(
+                'SELECT value, stored_at FROM cache WHERE namespace = ? AND key = ?',
+                (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error: {e}")
+            return None
+
+        if row is None:
+            return None
+
+        value, stored_at = row
+        if time.time() - stored_at > self.ttl_seconds:
+            return None
+        return json.loads(value), stored_at
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        entry = self.get_entry(namespace, key)
+        return entry[0] if entry else None
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"Cache write error: {e}")
+
+        if time.time() - self._last_purge > PURGE_INTERVAL_SECONDS:
+            self.purge_expired()
+
+    def purge_expired(self) -> None:
+        self._last_purge = time.time()
+        try:
+            self._connect().execute(
+                'DELETE FROM cache WHERE stored_at < ?',
+                (time.time() - self.ttl_seconds,)
+            )
+        except sqlite3.Error as e:
+            print(f"Cache purge error: {e}")
+
+
+class NullCache:
+    """Stand-in used when CACHE_ENABLED is off."""
+
+    def get_entry(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        return None
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        pass
+
+    def purge_expired(self) -> None:
+        pass
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        if os.getenv('CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            _cache = NullCache()
+        else:
+            _cache = SharedCache(
+                os.getenv('CACHE_PATH', str(DEFAULT_CACHE_PATH)),
+                float(os.getenv('CACHE_TTL_SECONDS', '86400'))
+            )
+    return _cache
@@ -0,0 +1,132 @@
+"""Canonicalization and near-duplicate clustering of extracted names.
+
+canonical_key() turns a surface form into a comparison key: Unicode
+normalized, accents and punctuation dropped, case folded, and person titles
+or company legal suffixes removed, so "Baskin-Robbins" and "Baskin Robbins",
+or "Dr. Jane Doe" and "Jane Doe", share a key. NameIndex then clusters keys
+that differ only in spacing or word order. Long company names may also merge
+on a small edit distance (OCR typos); person names never do, since "Mark
+Johnson" and "Mary Johnson" are different people. To stay sub-quadratic it
+only compares names that share a blocking key (a token or whole-name prefix).
+"""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set
+
+PERSON_TITLES = {
+    'dr', 'mr', 'mrs', 'ms', 'miss', 'mx', 'prof', 'professor', 'sir', 'dame', 'madam',
+}
+PERSON_SUFFIXES = {
+    'phd', 'md', 'mba', 'jr', 'sr', 'ii', 'iii', 'iv', 'esq', 'cpa',
+}
+COMPANY_SUFFIXES = {
+    'inc', 'incorporated', 'llc', 'llp', 'ltd', 'limited', 'corp', 'corporation',
+    'co', 'plc', 'gmbh', 'ag', 'sa', 'bv', 'nv', 'pty',
+}
+BLOCKING_STOPWORDS = {'the', 'and', 'of', 'for'}
+
+SIMILARITY_THRESHOLD = 0.9
+# Shorter company names are too easy to confuse by edit distance
+FUZZY_MIN_LENGTH = 10
+BLOCK_PREFIX = 4
+
+
+def normalize_text(name: str) -> str:
+    """Fold case, accents, ampersands and punctuation into plain words."""
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = text.casefold().replace('&', ' and ')
+    text = re.sub(r'[^\w\s]|_', ' ', text)
+    return ' '.join(text.split())
+
+
+def canonical_key(name: str, tag: Optional[str] = None) -> str:
+    tokens = normalize_text(name).split()
+
+    if tag == 'people':
+        while len(tokens) > 1 and tokens[0] in PERSON_TITLES:
+            tokens = tokens[1:]
+        while len(tokens) > 1 and tokens[-1] in PERSON_SUFFIXES:
+            tokens = tokens[:-1]
+    elif tag == 'companies':
+        while len(tokens) > 1 and tokens[-1] in COMPANY_SUFFIXES:
+            tokens = tokens[:-1]
+
+    return ' '.join(tokens)
+
+
+def _blocking_keys(key: str) -> Set[str]:
+    compact = key.replace(' ', '')
+    blocks = {'=' + compact[:BLOCK_PREFIX]}
+    for token in key.split():
+        if len(token) >= 3 and token not in BLOCKING_STOPWORDS:
+            blocks.add(token[:BLOCK_PREFIX])
+    return blocks
+
+
+def _similar(a: str, b: str, fuzzy: bool) -> bool:
+    compact_a, compact_b = a.replace(' ', ''), b.replace(' ', '')
+    if compact_a == compact_b:
+        return True
+    # Same words in a different order ("Doe Jane" / "Jane Doe")
+    if sorted(a.split()) == sorted(b.split()):
+        return True
+    if not fuzzy or min(len(compact_a), len(compact_b)) < FUZZY_MIN_LENGTH:
+        return False
+    matcher = SequenceMatcher(None, compact_a, compact_b, autojunk=False)
+    if matcher.real_quick_ratio() < SIMILARITY_THRESHOLD or matcher.quick_ratio() < SIMILARITY_THRESHOLD:
+        return False
+    return matcher.ratio() >= SIMILARITY_THRESHOLD
+
+
+class NameIndex:
+    """Assigns each name to a cluster of near-duplicates.
+
+    The first name seen in a cluster is its representative; add() returns
+    the representative's canonical key, which is stable for the cluster.
+    """
+
+    def __init__(self, tag: Optional[str] = None):
+        self.tag = tag
+        self._clusters: Dict[str, str] = {}  # canonical key -> representative key
+        self._blocks: Dict[str, List[str]] = {}
+        self._order: Dict[str, int] = {}
+
+    def add(self, name: str) -> str:
+        key = canonical_key(name, self.tag)
+        if key in self._clusters:
+            return self._clusters[key]
+
+        blocks = _blocking_keys(key)
+        representative = None
+        # Ordered so a name close to two clusters always joins the older one
+        candidates = dict.fromkeys(c for block in sorted(blocks) for c in self._blocks.get(block, ()))
+        for candidate in sorted(candidates, key=self._order.__getitem__):
+            if _similar(key, candidate, fuzzy=self.tag == 'companies'):
+                representative = self._clusters[candidate]
+                break
+
+        if representative is None:
+            representative = key
+        self._clusters[key] = representative
+        self._order[key] = len(self._order)
+        for block in blocks:
+            self._blocks.setdefault(block, []).append(key)
+        return representative
+
+
+def dedupe_names(names: List[str], tag: Optional[str] = None) -> List[str]:
+    """Keep the first surface form of every distinct entity, in order."""
+    index = NameIndex(tag)
+    seen = set()
+    unique = []
+    for name in names:
+        name = name.strip()
+        if not name:
+            continue
+        cluster = index.add(name)
+        if cluster not in seen:
+            seen.add(cluster)
+            unique.append(name)
+    return unique
@@ -0,0 +1,57 @@
+"""Per-request deadlines shared by every pipeline stage.
+
+A Deadline is created when a request arrives, from REQUEST_DEADLINE_SECONDS
+or the client's X-Request-Deadline header, and handed down to the analyzers,
+OCR and LinkedIn lookups. Each stage sizes its own timeout from whatever
+budget is left and skips optional work once it is spent.
+"""
+import math
+import os
+import time
+from typing import Optional
+
+# Never hand a stage less than this; an upstream call with a near-zero
+# timeout can only fail.
+MIN_STAGE_TIMEOUT = 1.0
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap: float, reserve: float = 0.0) -> float:
+        """Timeout for one stage: what is left (minus `reserve` for the stages
+        after it), but no more than `cap`."""
+        return max(min(self.remaining() - reserve, cap), MIN_STAGE_TIMEOUT)
+
+
+def stage_timeout(deadline: Optional[Deadline], cap: float, reserve: float = 0.0) -> float:
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap, reserve)
+
+
+def deadline_from_header(value: Optional[str]) -> Deadline:
+    """Build a deadline from an X-Request-Deadline header (seconds), falling
+    back to the configured default and never exceeding the configured max."""
+    default = float(os.getenv('REQUEST_DEADLINE_SECONDS', '30'))
+    maximum = float(os.getenv('REQUEST_DEADLINE_MAX_SECONDS', '120'))
+
+    seconds = default
+    if value:
+        try:
+            parsed = float(value)
+        except ValueError:
+            parsed = None
+        # "nan" and "inf" parse as floats but make a deadline that never expires
+        if parsed is not None and math.isfinite(parsed):
+            seconds = parsed
+
+    return Deadline(min(max(seconds, MIN_STAGE_TIMEOUT), maximum))
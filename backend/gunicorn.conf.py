@@ -0,0 +1,47 @@
+# Multi-worker serving mode for Halo Trace
+#
+#   cd backend
+#   gunicorn -c gunicorn.conf.py main:app
+#
+# The app is imported once in the master process and the EasyOCR weights are
+# loaded there before forking, so every worker shares the same pages
+# copy-on-write instead of holding its own copy. Workers share LinkedIn
+# lookups and image results through the SQLite cache in cache.py.
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WORKERS', multiprocessing.cpu_count()))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+
+# Recycle workers after a number of requests to cap slow memory growth.
+# Jitter keeps all workers from restarting at the same moment.
+max_requests = int(os.getenv('MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('MAX_REQUESTS_JITTER', '100'))
+timeout = int(os.getenv('WORKER_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('WORKER_GRACEFUL_TIMEOUT', '30'))
+
+
+def when_ready(server):
+    import main
+
+    if os.getenv('PRELOAD_MODELS', 'true').lower() not in ('0', 'false', 'no'):
+        server.log.info("Preloading models in master process")
+        main.preload_models()
+
+    main.get_cache().purge_expired()
+
+    # Move everything allocated so far into the permanent generation so the
+    # garbage collector does not touch (and un-share) those pages in workers.
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Torch would otherwise start one thread per core in every worker.
+    torch = sys.modules.get('torch')
+    if torch is not None:
+        torch.set_num_threads(int(os.getenv('TORCH_THREADS_PER_WORKER', '1')))
@@ -1,21 +1,43 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, RedirectResponse
+from urllib.parse import quote
 from pydantic import BaseModel
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
 from pathlib import Path
-import easyocr
 from PIL import Image
-import numpy as np
 import io
-import anthropic
-from groq import Groq
 import re
 import base64
 import json
-from duckduckgo_search import DDGS
-import google.generativeai as genai
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from cache import get_cache
+from router import AllProvidersFailed, Provider, ProviderRouter
+from admission import AdmissionController, EndpointLimit
+from triage import triage_image, triage_stats, SKIP, CHEAP
+from deadline import Deadline, deadline_from_header, stage_timeout
+import profiling
+from profiling import stage
+from batching import MicroBatcher
+from canonical import NameIndex, canonical_key, dedupe_names
+
+# Upper bounds for a single upstream call; a request deadline can only shorten them
+VISION_TIMEOUT = 60.0
+TEXT_TIMEOUT = 30.0
+SEARCH_QUERY_TIMEOUT = 10.0
+# Requests with less time left than this skip name-extraction batching, so a
+# nearly-expired request neither waits on nor shortens someone else's batch
+BATCH_MIN_REMAINING = 5.0
+
+# Heavy backends (easyocr/torch, anthropic, groq, google.generativeai,
+# duckduckgo_search, numpy) are imported on first use so that a worker only
+# pays for the backends its .env actually enables.
 
 # Load .env from root directory
 env_path = Path(__file__).parent.parent / '.env'
@@ -32,16 +54,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize EasyOCR reader (lazy loading)
+# Initialize EasyOCR reader (lazy loading, or preloaded by gunicorn.conf.py
+# in the master process so forked workers share the weights copy-on-write)
 ocr_reader = None
+ocr_reader_lock = threading.Lock()
 
 def get_ocr_reader():
     global ocr_reader
     if ocr_reader is None:
-        ocr_reader = easyocr.Reader(['en'], gpu=False)
+        # Pipeline work runs in the threadpool; without the lock concurrent
+        # first requests would each load the torch weights
+        with ocr_reader_lock:
+            if ocr_reader is None:
+                import easyocr
+                ocr_reader = easyocr.Reader(['en'], gpu=False)
     return ocr_reader
 
 
+# API clients (lazy loading, only for backends with a key in .env)
+gemini_model = None
+groq_client = None
+anthropic_client = None
+clients_lock = threading.Lock()
+
+def get_gemini_model():
+    global gemini_model
+    if gemini_model is None:
+        with clients_lock:
+            if gemini_model is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                gemini_model = genai.GenerativeModel('gemini-2.0-flash')
+    return gemini_model
+
+
+def get_groq_client():
+    global groq_client
+    if groq_client is None:
+        with clients_lock:
+            if groq_client is None:
+                from groq import Groq
+                groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+    return groq_client
+
+
+def get_anthropic_client():
+    global anthropic_client
+    if anthropic_client is None:
+        with clients_lock:
+            if anthropic_client is None:
+                import anthropic
+                anthropic_client = anthropic.Anthropic(api_key=os.getenv('ANTHROPIC_API_KEY'))
+    return anthropic_client
+
+
+def ocr_enabled() -> bool:
+    return os.getenv('EASYOCR_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def triage_enabled() -> bool:
+    return os.getenv('TRIAGE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
+
+def preload_models():
+    """Load enabled backends and model weights before workers are forked."""
+    if os.getenv('GEMINI_API_KEY'):
+        get_gemini_model()
+    if os.getenv('GROQ_API_KEY'):
+        get_groq_client()
+    if os.getenv('ANTHROPIC_API_KEY'):
+        get_anthropic_client()
+    if ocr_enabled():
+        get_ocr_reader()
+
+
 class SearchRequest(BaseModel):
     names: List[str]
     tag: str  # 'companies' or 'people'
@@ -52,15 +138,53 @@ class SearchResult(BaseModel):
     linkedinUrl: Optional[str] = None
     isExactMatch: bool
     profileTitle: Optional[str] = None
+    # False when the search failed or was cut short by the deadline, so a
+    # missing match does not mean there is no profile
+    complete: bool = True
 
 
 class SearchResponse(BaseModel):
     results: List[SearchResult]
-
-
-def find_linkedin_profile(name: str, tag: str) -> dict:
-    """Search for exact LinkedIn profile URL using DuckDuckGo."""
+    partial: bool = False
+
+
+def find_linkedin_profile(
+    name: str,
+    tag: str,
+    deadline: Optional[Deadline] = None,
+    max_age: Optional[float] = None
+) -> dict:
+    """Look up a LinkedIn profile, sharing results across worker processes.
+
+    Cached results older than `max_age` seconds are searched again. The
+    cache is keyed by canonical name, but `name` is what gets searched, so it
+    should be a real surface form; it is stored as 'display_name' for later
+    refreshes.
+    """
+    cache_key = f"{tag}:{canonical_key(name, tag)}"
+    cached = get_cache().get_entry('lookup', cache_key)
+    if cached is not None and (max_age is None or time.time() - cached[1] <= max_age):
+        return cached[0]
+
+    profile = search_linkedin_profile(name, tag, deadline)
+    # A search that errored out or was cut short by the deadline may have
+    # missed the real profile; only completed searches are shared.
+    if profile['complete']:
+        get_cache().set('lookup', cache_key, {**profile, 'display_name': name})
+    return profile
+
+
+def search_linkedin_profile(name: str, tag: str, deadline: Optional[Deadline] = None) -> dict:
+    """Search for exact LinkedIn profile URL using DuckDuckGo.
+
+    'complete' in the result is False when no query succeeded or the
+    deadline cut the remaining queries, i.e. a "no match" is not reliable.
+    """
+    succeeded = False
+    skipped = False
     try:
+        from duckduckgo_search import DDGS
+
         # Try multiple search strategies
         search_queries = []
 
@@ -81,11 +205,17 @@ def find_linkedin_profile(name: str, tag: str) -> dict:
                 f'{name} professional linkedin'
             ]
 
-        # Try each search query
+        # Try each search query, dropping the remaining strategies once the
+        # request deadline has passed
         for query in search_queries:
+            if deadline is not None and deadline.expired():
+                print(f"Deadline reached, skipping remaining searches for {name}")
+                skipped = True
+                break
             try:
-                with DDGS() as ddgs:
+                with DDGS(timeout=int(stage_timeout(deadline, SEARCH_QUERY_TIMEOUT))) as ddgs:
                     results = list(ddgs.text(query, max_results=15))
+                succeeded = True
 
                 if results:
                     for result in results:
@@ -107,7 +237,8 @@ def find_linkedin_profile(name: str, tag: str) -> dict:
                                 return {
                                     'url': clean_url,
                                     'isExact': True,
-                                    'title': title
+                                    'title': title,
+                                    'complete': True
                                 }
                         elif tag == 'companies' and '/school/' in url:
                             # Handle school/university pages
@@ -118,7 +249,8 @@ def find_linkedin_profile(name: str, tag: str) -> dict:
                                 return {
                                     'url': clean_url,
                                     'isExact': True,
-                                    'title': title
+                                    'title': title,
+                                    'complete': True
                                 }
                         elif tag == 'people' and '/in/' in url:
                             # Extract clean profile URL
@@ -130,12 +262,15 @@ def find_linkedin_profile(name: str, tag: str) -> dict:
                                 return {
                                     'url': clean_url,
                                     'isExact': True,
-                                    'title': title
+                                    'title': title,
+                                    'complete': True
                                 }
             except Exception as e:
                 print(f"Search query failed: {query}, error: {e}")
                 continue
 
+        complete = succeeded and not skipped
+
         # Fallback: Try to construct a likely LinkedIn URL
         if tag == 'companies':
             # Generate slug from name
@@ -143,19 +278,22 @@ def find_linkedin_profile(name: str, tag: str) -> dict:
             slug = re.sub(r'[^a-z0-9\s-]', '', slug)
             slug = re.sub(r'\s+', '-', slug.strip())
 
-            # Return constructed URL as a best guess
+            # Return constructed URL as a best guess; a name the deadline
+            # kept us from searching is not presented as a match
             constructed_url = f"https://www.linkedin.com/company/{slug}"
             return {
                 'url': constructed_url,
-                'isExact': True,
-                'title': f"{name} | LinkedIn"
+                'isExact': not skipped,
+                'title': f"{name} | LinkedIn",
+                'complete': complete
             }
 
         # If no exact match found, return no match
         return {
             'url': None,
             'isExact': False,
-            'title': None
+            'title': None,
+            'complete': complete
         }
 
     except Exception as e:
@@ -169,13 +307,15 @@ def find_linkedin_profile(name: str, tag: str) -> dict:
             return {
                 'url': f"https://www.linkedin.com/company/{slug}",
                 'isExact': True,
-                'title': f"{name} | LinkedIn"
+                'title': f"{name} | LinkedIn",
+                'complete': False
             }
 
         return {
             'url': None,
             'isExact': False,
-            'title': None
+            'title': None,
+            'complete': False
         }
 
 
@@ -225,6 +365,7 @@ def validate_company_names(names: List[str]) -> List[str]:
 
     validated = []
     seen = set()
+    index = NameIndex('companies')
 
     for name in names:
         name = name.strip()
@@ -258,10 +399,10 @@ def validate_company_names(names: List[str]) -> List[str]:
             if name not in known_caps:
                 continue
 
-        # Normalize to avoid duplicates
-        name_lower = name.lower()
-        if name_lower not in seen:
-            seen.add(name_lower)
+        # Collapse spelling variants of the same entity
+        cluster = index.add(name)
+        if cluster not in seen:
+            seen.add(cluster)
             validated.append(name)
 
     return validated
@@ -293,6 +434,7 @@ def validate_person_names(names: List[str]) -> List[str]:
 
     validated = []
     seen = set()
+    index = NameIndex('people')
 
     for name in names:
         name = name.strip()
@@ -338,17 +480,17 @@ def validate_person_names(names: List[str]) -> List[str]:
         if len(words) > 2 and (name.isupper() or name.islower()):
             continue
 
-        # Normalize to avoid duplicates
-        name_lower = name.lower()
-        if name_lower not in seen:
-            seen.add(name_lower)
+        # Collapse spelling variants of the same person
+        cluster = index.add(name)
+        if cluster not in seen:
+            seen.add(cluster)
             # Capitalize properly
             validated.append(' '.join(word.capitalize() for word in words))
 
     return validated
 
 
-def analyze_image_with_gemini(image_data: bytes, tag: str) -> List[dict]:
+def analyze_image_with_gemini(image_data: bytes, tag: str, deadline: Optional[Deadline] = None) -> List[dict]:
     """Use Google's Gemini Vision API to analyze images and get LinkedIn URLs."""
     api_key = os.getenv('GEMINI_API_KEY')
 
@@ -356,8 +498,7 @@ def analyze_image_with_gemini(image_data: bytes, tag: str) -> List[dict]:
         return []
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = get_gemini_model()
 
         # Create image part
         img = Image.open(io.BytesIO(image_data))
@@ -433,7 +574,10 @@ For every distinct organization logo or person identifiable in the image:
   }
 ]"""
 
-        response = model.generate_content([prompt, img])
+        response = model.generate_content(
+            [prompt, img],
+            request_options={"timeout": stage_timeout(deadline, VISION_TIMEOUT)}
+        )
         response_text = response.text.strip()
 
         # Parse JSON response
@@ -452,10 +596,10 @@ For every distinct organization logo or person identifiable in the image:
 
     except Exception as e:
         print(f"Gemini Vision API error: {e}")
-        return []
+        raise
 
 
-def analyze_image_with_groq(image_data: bytes, tag: str) -> List[dict]:
+def analyze_image_with_groq(image_data: bytes, tag: str, deadline: Optional[Deadline] = None) -> List[dict]:
     """Use Groq's Llama Vision API to analyze images and get LinkedIn URLs."""
     api_key = os.getenv('GROQ_API_KEY')
 
@@ -463,7 +607,7 @@ def analyze_image_with_groq(image_data: bytes, tag: str) -> List[dict]:
         return []
 
     try:
-        client = Groq(api_key=api_key)
+        client = get_groq_client()
 
         # Convert image to base64
         base64_image = base64.b64encode(image_data).decode('utf-8')
@@ -478,6 +622,7 @@ def analyze_image_with_groq(image_data: bytes, tag: str) -> List[dict]:
         completion = client.chat.completions.create(
             model="llama-3.2-11b-vision-preview",
             temperature=0.1,
+            timeout=stage_timeout(deadline, VISION_TIMEOUT),
             messages=[
                 {
                     "role": "system",
@@ -548,10 +693,10 @@ For every distinct organization logo or person identifiable in the image:
 
     except Exception as e:
         print(f"Groq Vision API error: {e}")
-        return []
+        raise
 
 
-def analyze_image_with_vision(image_data: bytes, tag: str) -> List[str]:
+def analyze_image_with_vision(image_data: bytes, tag: str, deadline: Optional[Deadline] = None) -> List[str]:
     """Use Claude's vision API to analyze images for logos, faces, and text."""
     api_key = os.getenv('ANTHROPIC_API_KEY')
 
@@ -559,7 +704,7 @@ def analyze_image_with_vision(image_data: bytes, tag: str) -> List[str]:
         return []
 
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = get_anthropic_client()
 
         # Convert image to base64
         image_base64 = base64.b64encode(image_data).decode('utf-8')
@@ -634,6 +779,7 @@ If you cannot identify any person names, return an empty array: []"""
         message = client.messages.create(
             model="claude-3-5-sonnet-20241022",
             max_tokens=1024,
+            timeout=stage_timeout(deadline, VISION_TIMEOUT),
             messages=[
                 {
                     "role": "user",
@@ -672,18 +818,37 @@ If you cannot identify any person names, return an empty array: []"""
 
     except Exception as e:
         print(f"Vision API error: {e}")
-        return []
+        raise
 
 
-def extract_names_with_ocr_and_claude(image_data: bytes, raw_text: str, tag: str) -> List[str]:
+def extract_names_with_ocr_and_claude(image_data: bytes, raw_text: str, tag: str, deadline: Optional[Deadline] = None) -> List[str]:
     """Combine OCR text with Claude for intelligent name extraction."""
     api_key = os.getenv('ANTHROPIC_API_KEY')
 
     if not api_key or not raw_text:
-        return basic_extract_names(raw_text)
+        return basic_extract_names(raw_text, tag)
+
+    # Out of time: heuristics are instant, a model call is not
+    if deadline is not None and deadline.expired():
+        return basic_extract_names(raw_text, tag)
+
+    # Concurrent requests share one Haiku call when batching is on
+    batcher = get_name_batcher(tag)
+    if batcher is not None and (deadline is None or deadline.remaining() >= BATCH_MIN_REMAINING):
+        try:
+            return batcher.submit((raw_text, deadline),
+                                  timeout=stage_timeout(deadline, TEXT_TIMEOUT) + batcher.window)
+        except TimeoutError:
+            print("Batched name extraction timed out, using basic extraction")
+            return basic_extract_names(raw_text, tag)
 
+    return claude_extract_names(raw_text, tag, deadline)
+
+
+def claude_extract_names(raw_text: str, tag: str, deadline: Optional[Deadline] = None) -> List[str]:
+    """Single Claude Haiku call to pick names out of one OCR text."""
     try:
-        client = anthropic.Anthropic(api_key=api_key)
+        client = get_anthropic_client()
 
         if tag == 'companies':
             prompt = f"""Extract company/organization names from this OCR text.
@@ -718,6 +883,7 @@ Return format: ["John Smith", "Sarah Johnson"]"""
         message = client.messages.create(
             model="claude-3-haiku-20240307",
             max_tokens=1024,
+            timeout=stage_timeout(deadline, TEXT_TIMEOUT),
             messages=[
                 {
                     "role": "user",
@@ -739,14 +905,106 @@ Return format: ["John Smith", "Sarah Johnson"]"""
                 names = json.loads(response_text[start:end])
                 return names[:20]
 
-        return basic_extract_names(raw_text)
+        return basic_extract_names(raw_text, tag)
 
     except Exception as e:
         print(f"Claude API error: {e}")
-        return basic_extract_names(raw_text)
+        return basic_extract_names(raw_text, tag)
+
 
+def claude_extract_names_batch(items: List[tuple], tag: str) -> List[List[str]]:
+    """One Claude Haiku call for several OCR texts; raises if the answer
+    cannot be split back into one name list per text."""
+    client = get_anthropic_client()
 
-def basic_extract_names(text: str) -> List[str]:
+    documents = '\n\n'.join(
+        f'<document id="{i}">\n{raw_text}\n</document>'
+        for i, (raw_text, _) in enumerate(items, start=1)
+    )
+
+    if tag == 'companies':
+        task = """Extract company/organization names from each OCR document below.
+Remove duplicates and filter out random words, numbers, or incomplete text.
+Focus on:
+- Company/organization names (full official names)
+- Brand names
+- Institution names
+
+Be very accurate - only extract clear, complete company names.
+Treat every document separately; never move a name from one document to another."""
+        example = '{"1": ["Company 1", "Company 2"], "2": []}'
+    else:
+        task = """Extract person names from each OCR document below.
+Remove duplicates and filter out random words, numbers, or incomplete text.
+Focus on:
+- Full person names (first and last name together)
+
+Be very accurate - only extract clear, complete names.
+Do not include titles, positions, or partial names.
+Treat every document separately; never move a name from one document to another."""
+        example = '{"1": ["John Smith", "Sarah Johnson"], "2": []}'
+
+    prompt = f"""{task}
+
+{documents}
+
+Return ONLY a JSON object with one key per document id, each mapping to a JSON array of names, nothing else.
+Return format: {example}"""
+
+    # Every request in the batch waits on this call, so it gets no more time
+    # than the least patient one has left
+    timeout = min(stage_timeout(deadline, TEXT_TIMEOUT) for _, deadline in items)
+
+    message = client.messages.create(
+        model="claude-3-haiku-20240307",
+        max_tokens=min(1024 * len(items), 4096),
+        timeout=timeout,
+        messages=[
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    )
+
+    response_text = message.content[0].text.strip()
+    start = response_text.find('{')
+    end = response_text.rfind('}') + 1
+    if start == -1 or end <= start:
+        raise ValueError("no JSON object in batched response")
+
+    parsed = json.loads(response_text[start:end])
+    results = []
+    for i in range(1, len(items) + 1):
+        names = parsed.get(str(i))
+        if not isinstance(names, list):
+            raise ValueError(f"missing names for document {i}")
+        results.append([n for n in names if isinstance(n, str)][:20])
+    return results
+
+
+# Micro-batchers for Haiku name extraction, one per tag (lazy loading)
+name_batchers = {}
+name_batchers_lock = threading.Lock()
+
+def get_name_batcher(tag: str) -> Optional[MicroBatcher]:
+    window_ms = float(os.getenv('LLM_BATCH_WINDOW_MS', '50'))
+    max_batch = int(os.getenv('LLM_BATCH_MAX_SIZE', '8'))
+    if window_ms <= 0 or max_batch <= 1:
+        return None
+
+    with name_batchers_lock:
+        if tag not in name_batchers:
+            name_batchers[tag] = MicroBatcher(
+                batch_fn=lambda items: claude_extract_names_batch(items, tag),
+                single_fn=lambda item: claude_extract_names(item[0], tag, item[1]),
+                window=window_ms / 1000,
+                max_batch=max_batch,
+            )
+        return name_batchers[tag]
+
+
+def basic_extract_names(text: str, tag: Optional[str] = None) -> List[str]:
     """Basic name extraction without AI."""
     if not text:
         return []
@@ -764,14 +1022,141 @@ def basic_extract_names(text: str) -> List[str]:
             continue
         names.append(line)
 
-    seen = set()
-    unique_names = []
-    for name in names:
-        if name.lower() not in seen:
-            seen.add(name.lower())
-            unique_names.append(name)
+    return dedupe_names(names, tag)[:20]
+
+
+def validate_names(names: List[str], tag: str) -> List[str]:
+    if tag == 'companies':
+        return validate_company_names(names)
+    return validate_person_names(names)
 
-    return unique_names[:20]
+
+def run_gemini(img_bytes: bytes, image: Image.Image, tag: str, deadline: Optional[Deadline]) -> dict:
+    with stage('gemini'):
+        results = analyze_image_with_gemini(img_bytes, tag, deadline)
+    names = [r.get('name', '').strip() for r in results if isinstance(r, dict)]
+    return {'names': validate_names([n for n in names if n], tag), 'raw_text': ''}
+
+
+def run_groq(img_bytes: bytes, image: Image.Image, tag: str, deadline: Optional[Deadline]) -> dict:
+    with stage('groq'):
+        results = analyze_image_with_groq(img_bytes, tag, deadline)
+    names = [r.get('name', '').strip() for r in results if isinstance(r, dict)]
+    return {'names': validate_names([n for n in names if n], tag), 'raw_text': ''}
+
+
+def run_claude_vision(img_bytes: bytes, tag: str, deadline: Optional[Deadline]) -> List[str]:
+    with stage('claude_vision'):
+        names = analyze_image_with_vision(img_bytes, tag, deadline)
+    return [n.strip() for n in names if isinstance(n, str)]
+
+
+def run_ocr(img_bytes: bytes, image: Image.Image, tag: str, deadline: Optional[Deadline]) -> tuple:
+    """EasyOCR text, with names picked out by Claude (or heuristics without a key)."""
+    import numpy as np
+    with stage('easyocr'):
+        reader = get_ocr_reader()
+        ocr_results = reader.readtext(np.array(image))
+    raw_text = '\n'.join([text for _, text, _ in ocr_results])
+
+    with stage('ocr_name_extraction'):
+        names = extract_names_with_ocr_and_claude(img_bytes, raw_text, tag, deadline)
+    return [n.strip() for n in names], raw_text
+
+
+def run_claude_and_ocr(img_bytes: bytes, image: Image.Image, tag: str, deadline: Optional[Deadline]) -> dict:
+    """Last-resort path: Claude vision and EasyOCR together, names merged.
+
+    OCR often reads names that Claude vision misses, so both run and the
+    results are combined, vision names first. Only if every part that ran
+    failed does the provider count as failed.
+    """
+    vision_names, ocr_names, raw_text = [], [], ''
+    errors = []
+
+    if os.getenv('ANTHROPIC_API_KEY'):
+        try:
+            vision_names = run_claude_vision(img_bytes, tag, deadline)
+        except Exception as e:
+            errors.append(e)
+
+    ran_ocr = False
+    if ocr_enabled() and not (deadline is not None and deadline.expired()):
+        ran_ocr = True
+        try:
+            ocr_names, raw_text = run_ocr(img_bytes, image, tag, deadline)
+        except Exception as e:
+            print(f"OCR error: {e}")
+            errors.append(e)
+
+    attempted = bool(os.getenv('ANTHROPIC_API_KEY')) + ran_ocr
+    if errors and len(errors) == attempted:
+        raise errors[0]
+
+    return {'names': validate_names(vision_names + ocr_names, tag), 'raw_text': raw_text}
+
+
+# Vision providers, ranked at request time by observed latency and errors.
+# Initial latencies only set the order before any calls have been measured;
+# Gemini goes first, as it did before routing was introduced.
+provider_router = ProviderRouter([
+    Provider('gemini', run_gemini, lambda: bool(os.getenv('GEMINI_API_KEY')),
+             initial_latency=3.0, resolve_urls=True, timeout=VISION_TIMEOUT),
+    Provider('groq', run_groq, lambda: bool(os.getenv('GROQ_API_KEY')),
+             initial_latency=4.0, resolve_urls=True, timeout=VISION_TIMEOUT),
+    Provider('claude_ocr', run_claude_and_ocr, lambda: bool(os.getenv('ANTHROPIC_API_KEY')) or ocr_enabled(),
+             initial_latency=12.0, timeout=VISION_TIMEOUT),
+])
+
+
+# Admission control: /api/search is cheap and gets priority over /api/ocr,
+# which can fall through to several slow vision backends. The shared pool is
+# smaller than the sum of the endpoint limits, so the two compete for it and
+# priority decides. Limits apply per worker process.
+admission = AdmissionController(
+    total_slots=int(os.getenv('ADMISSION_TOTAL_SLOTS', '12')),
+    per_client_limit=int(os.getenv('ADMISSION_PER_CLIENT', '4')),
+    queue_timeout=float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '10')),
+    limits=[
+        EndpointLimit('search', priority=0, initial_service_time=2.0,
+                      max_concurrent=int(os.getenv('SEARCH_MAX_CONCURRENT', '12')),
+                      max_queue=int(os.getenv('SEARCH_MAX_QUEUE', '32'))),
+        EndpointLimit('ocr', priority=1, initial_service_time=10.0,
+                      max_concurrent=int(os.getenv('OCR_MAX_CONCURRENT', '4')),
+                      max_queue=int(os.getenv('OCR_MAX_QUEUE', '8'))),
+    ],
+)
+
+
+def client_id(request: Request) -> str:
+    """Client address for fair-share quotas.
+
+    Behind a reverse proxy or CDN every request comes from the proxy, so
+    TRUSTED_CLIENT_IP_HEADER (e.g. X-Forwarded-For or CF-Connecting-IP) names
+    a header set by it. The address is taken TRUSTED_PROXY_COUNT entries from
+    the right, i.e. the one our own outermost proxy saw; entries further left
+    are client-supplied and can be spoofed.
+    """
+    header = os.getenv('TRUSTED_CLIENT_IP_HEADER')
+    if header:
+        value = request.headers.get(header)
+        if value:
+            hops = [hop.strip() for hop in value.split(',') if hop.strip()]
+            proxy_count = max(int(os.getenv('TRUSTED_PROXY_COUNT', '1')), 1)
+            if hops:
+                return hops[-min(proxy_count, len(hops))]
+    return request.client.host if request.client else 'unknown'
+
+
+async def run_pipeline(http_request: Request, response: Response, label: str, fn, *args):
+    """Run blocking pipeline work in the threadpool, profiled on request."""
+    if not profiling.requested(http_request.headers.get('X-Profile')):
+        return await run_in_threadpool(fn, *args)
+
+    result, profile_id = await run_in_threadpool(profiling.run_profiled, label, fn, *args)
+    if profile_id:
+        response.headers['X-Profile-Id'] = profile_id
+    return result
 
 
 @app.get("/")
@@ -784,8 +1169,120 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/stats")
+async def stats():
+    return {
+        "providers": provider_router.snapshot(),
+        "admission": admission.snapshot(),
+        "triage": triage_stats.snapshot(),
+        "name_batching": {tag: batcher.snapshot() for tag, batcher in name_batchers.items()}
+    }
+
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, http_request: Request, format: str = 'json'):
+    """Download a request profile: the JSON summary or the raw cProfile stats."""
+    if not profiling.token_matches(http_request.headers.get('X-Profile')):
+        raise HTTPException(status_code=403, detail="Profiling access denied")
+
+    extension = 'prof' if format == 'prof' else 'json'
+    path = profiling.artifact_path(profile_id, extension)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    media_type = 'application/octet-stream' if extension == 'prof' else 'application/json'
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
+# Freshness of GET /api/lookup responses for browsers and edge caches. Misses
+# get a shorter window since a profile may appear later.
+LOOKUP_FRESH_SECONDS = int(os.getenv('LOOKUP_FRESH_SECONDS', '3600'))
+LOOKUP_MISS_FRESH_SECONDS = int(os.getenv('LOOKUP_MISS_FRESH_SECONDS', '300'))
+LOOKUP_STALE_SECONDS = int(os.getenv('LOOKUP_STALE_SECONDS', '86400'))
+
+
+def lookup_fresh_seconds(profile: dict) -> int:
+    return LOOKUP_FRESH_SECONDS if profile['isExact'] else LOOKUP_MISS_FRESH_SECONDS
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*' or candidate.removeprefix('W/') == etag:
+            return True
+    return False
+
+
+@app.get("/api/lookup/{tag}/{name:path}")
+async def lookup_profile(tag: str, name: str, http_request: Request, response: Response):
+    """Cacheable LinkedIn lookup for one name, keyed by tag and canonical name."""
+    if tag not in ('companies', 'people'):
+        raise HTTPException(status_code=400, detail="Tag must be 'companies' or 'people'")
+
+    key = canonical_key(name, tag)
+    if not key:
+        raise HTTPException(status_code=400, detail="No name provided")
+
+    # The canonical key is only an identifier ("AT&T" -> "at and t"); searches
+    # use a real surface form: the one in the request, or the one stored with
+    # the cache entry when the canonical URL is requested directly.
+    cache_key = f"{tag}:{key}"
+    entry = get_cache().get_entry('lookup', cache_key)
+    if entry is None or time.time() - entry[1] > lookup_fresh_seconds(entry[0]):
+        search_name = name
+        if name == key and entry is not None:
+            search_name = entry[0].get('display_name', key)
+        deadline = deadline_from_header(http_request.headers.get('X-Request-Deadline'))
+        max_age = lookup_fresh_seconds(entry[0]) if entry else None
+        async with admission.admit('search', client_id(http_request)):
+            profile = await run_pipeline(http_request, response, 'lookup', find_linkedin_profile,
+                                         search_name, tag, deadline, max_age)
+        entry = get_cache().get_entry('lookup', cache_key)
+        if entry is None:
+            # Not cached (deadline cut the search short, or caching is off)
+            entry = (profile, None)
+
+    profile, stored_at = entry
+
+    # One URL per entity, so every spelling variant hits the same cache
+    # entry. Uncached results are answered here, since the canonical URL
+    # would have to search again without the surface form.
+    if name != key and stored_at is not None:
+        return RedirectResponse(
+            f"/api/lookup/{tag}/{quote(key)}",
+            status_code=308,
+            headers={"Cache-Control": f"public, max-age={LOOKUP_STALE_SECONDS}"}
+        )
+    body = {
+        "name": key,
+        "tag": tag,
+        "linkedinUrl": profile['url'],
+        "isExactMatch": profile['isExact'],
+        "profileTitle": profile['title']
+    }
+    etag = '"' + hashlib.sha256(json.dumps(body, sort_keys=True).encode()).hexdigest()[:32] + '"'
+
+    if stored_at is None:
+        cache_control = "no-store"
+    else:
+        max_age = max(int(lookup_fresh_seconds(profile) - (time.time() - stored_at)), 0)
+        cache_control = f"public, max-age={max_age}, stale-while-revalidate={LOOKUP_STALE_SECONDS}"
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if stored_at is not None:
+        headers["Last-Modified"] = formatdate(stored_at, usegmt=True)
+
+    if etag_matches(http_request.headers.get('If-None-Match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return body
+
+
 @app.post("/api/search", response_model=SearchResponse)
-async def search_profiles(request: SearchRequest):
+async def search_profiles(request: SearchRequest, http_request: Request, response: Response):
     """Find LinkedIn profiles for extracted names."""
     if not request.names:
         raise HTTPException(status_code=400, detail="No names provided")
@@ -793,23 +1290,43 @@ async def search_profiles(request: SearchRequest):
     if len(request.names) > 20:
         raise HTTPException(status_code=400, detail="Maximum 20 names allowed")
 
+    deadline = deadline_from_header(http_request.headers.get('X-Request-Deadline'))
+    async with admission.admit('search', client_id(http_request)):
+        results = await run_pipeline(http_request, response, 'search', lookup_profiles,
+                                     request.names, request.tag, deadline)
+
+    return SearchResponse(results=results, partial=not all(result.complete for result in results))
+
+
+def lookup_profiles(names: List[str], tag: str, deadline: Optional[Deadline] = None) -> List[SearchResult]:
+    # Spelling variants of one entity share a single search
+    index = NameIndex(tag)
+    profiles = {}
+
     results = []
-    for name in request.names:
+    for name in names:
         name = name.strip()
-        profile_data = find_linkedin_profile(name, request.tag)
+        cluster = index.add(name)
+        if cluster not in profiles:
+            with stage('linkedin_lookup'):
+                profiles[cluster] = find_linkedin_profile(name, tag, deadline)
+        profile_data = profiles[cluster]
 
         results.append(SearchResult(
             name=name,
             linkedinUrl=profile_data['url'],
             isExactMatch=profile_data['isExact'],
-            profileTitle=profile_data['title']
+            profileTitle=profile_data['title'],
+            complete=profile_data['complete']
         ))
 
-    return SearchResponse(results=results)
+    return results
 
 
 @app.post("/api/ocr")
 async def extract_text(
+    http_request: Request,
+    response: Response,
     file: UploadFile = File(...),
     tag: str = Form(default="companies")
 ):
@@ -817,98 +1334,114 @@ async def extract_text(
     if not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
 
-    try:
-        # Read image
-        contents = await file.read()
+    deadline = deadline_from_header(http_request.headers.get('X-Request-Deadline'))
+    async with admission.admit('ocr', client_id(http_request)):
+        try:
+            # Read image
+            contents = await file.read()
+            return await run_pipeline(http_request, response, 'ocr', process_image,
+                                      contents, tag, deadline)
+
+        except Exception as e:
+            print(f"Error processing image: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def process_image(contents: bytes, tag: str, deadline: Optional[Deadline] = None) -> dict:
+    """Run an uploaded image through the healthiest provider and resolve URLs.
+
+    With a deadline, fallback providers and URL lookups are dropped once it
+    passes and whatever was found so far is returned with "partial": True.
+    A result is also partial when any URL lookup did not complete; partial
+    results are not cached.
+    """
+    # Identical uploads are served from the shared cache
+    image_key = f"{tag}:{hashlib.sha256(contents).hexdigest()}"
+    cached = get_cache().get('image', image_key)
+    if cached is not None:
+        return cached
+
+    with stage('decode'):
         image = Image.open(io.BytesIO(contents))
 
         # Convert to RGB if necessary
         if image.mode in ('RGBA', 'P'):
             image = image.convert('RGB')
 
-        # Save to bytes for processing
-        img_buffer = io.BytesIO()
-        image.save(img_buffer, format='JPEG')
-        img_bytes = img_buffer.getvalue()
-
-        # Primary Method: Use Gemini Vision API (returns names)
-        gemini_results = analyze_image_with_gemini(img_bytes, tag)
-
-        if gemini_results:
-            # Extract names from Gemini results
-            final_names = []
-
-            for result in gemini_results:
-                name = result.get('name', '').strip()
-                if name:
-                    final_names.append(name)
-
-            # Apply validation based on tag
-            if tag == 'companies':
-                validated_names = validate_company_names(final_names)
-                final_names = validated_names
-            else:
-                validated_names = validate_person_names(final_names)
-                final_names = validated_names
-
-            # Search for actual LinkedIn URLs using DuckDuckGo
-            linkedin_urls = {}
-            for name in final_names[:20]:
-                profile_result = find_linkedin_profile(name, tag)
-                if profile_result['isExact']:
-                    linkedin_urls[name] = profile_result['url']
-                # If not exact, don't add to linkedin_urls - frontend will show as search
-
+    # Answer hopeless images locally and give marginal ones a single attempt
+    max_attempts = None
+    if triage_enabled():
+        with stage('triage'):
+            triage = triage_image(image)
+        triage_stats.record(triage)
+        if triage['route'] == SKIP:
+            print(f"Triage skipped image: {triage['reason']} {triage['metrics']}")
             return {
                 "success": True,
-                "names": final_names[:20],
-                "linkedin_urls": linkedin_urls,
-                "raw_text": ""
+                "names": [],
+                "linkedin_urls": {},
+                "raw_text": "",
+                "partial": False
             }
+        if triage['route'] == CHEAP:
+            max_attempts = 1
 
-        # Fallback: Use Claude Vision + EasyOCR
-        vision_names = analyze_image_with_vision(img_bytes, tag)
-
-        # Use EasyOCR to extract text
-        image_np = np.array(image)
-        reader = get_ocr_reader()
-        ocr_results = reader.readtext(image_np)
-        raw_text = '\n'.join([text for _, text, _ in ocr_results])
-
-        # Use Claude to extract names from OCR text
-        ocr_names = extract_names_with_ocr_and_claude(img_bytes, raw_text, tag)
-
-        # Combine results, prioritizing vision results
-        all_names = vision_names + ocr_names
-
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_names = []
-        for name in all_names:
-            name_lower = name.lower().strip()
-            if name_lower and name_lower not in seen:
-                seen.add(name_lower)
-                unique_names.append(name.strip())
-
-        # Apply validation based on tag
-        if tag == 'companies':
-            unique_names = validate_company_names(unique_names)
-        else:
-            unique_names = validate_person_names(unique_names)
-
-        # Limit to 20 names
-        final_names = unique_names[:20]
+    # Save to bytes for processing
+    with stage('encode'):
+        img_buffer = io.BytesIO()
+        image.save(img_buffer, format='JPEG')
+        img_bytes = img_buffer.getvalue()
 
+    try:
+        provider, result = provider_router.route(
+            img_bytes, image, tag, deadline,
+            accept=lambda r: bool(r['names']),
+            max_attempts=max_attempts,
+            deadline=deadline
+        )
+    except AllProvidersFailed:
+        # Out of time is reported as a partial result below; anything else
+        # is a real failure the caller should see (and not cache)
+        if deadline is None or not deadline.expired():
+            raise
+        provider, result = None, None
+    if provider is None:
         return {
             "success": True,
-            "names": final_names,
+            "names": [],
             "linkedin_urls": {},
-            "raw_text": raw_text
+            "raw_text": "",
+            "partial": deadline is not None and deadline.expired()
         }
 
-    except Exception as e:
-        print(f"Error processing image: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    final_names = result['names'][:20]
+
+    # Search for actual LinkedIn URLs using DuckDuckGo
+    linkedin_urls = {}
+    partial = False
+    if provider.resolve_urls:
+        for name in final_names:
+            if deadline is not None and deadline.expired():
+                partial = True
+                break
+            with stage('linkedin_lookup'):
+                profile_result = find_linkedin_profile(name, tag, deadline)
+            if not profile_result['complete']:
+                partial = True
+            if profile_result['isExact']:
+                linkedin_urls[name] = profile_result['url']
+            # If not exact, don't add to linkedin_urls - frontend will show as search
+
+    response = {
+        "success": True,
+        "names": final_names,
+        "linkedin_urls": linkedin_urls,
+        "raw_text": result['raw_text'],
+        "partial": partial
+    }
+    if not partial:
+        get_cache().set('image', image_key, response)
+    return response
 
 
 if __name__ == "__main__":
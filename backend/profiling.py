@@ -0,0 +1,177 @@
+"""On-demand per-request profiling.
+
+A request is profiled when it carries an X-Profile header matching
+PROFILE_ADMIN_TOKEN, or when it is picked by PROFILE_SAMPLE_RATE. A profiled
+request runs under cProfile and tracemalloc, records wall and CPU time for
+each pipeline stage, and leaves two artifacts in PROFILE_DIR:
+  <id>.prof  cProfile stats, for snakeviz / pstats
+  <id>.json  stage breakdown, allocation peak and hottest functions
+Only the newest PROFILE_MAX_KEPT profiles are kept; older ones are pruned
+whenever a new one is written.
+
+When a request is not profiled, stage() only does a ContextVar lookup.
+"""
+import contextlib
+import contextvars
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+DEFAULT_PROFILE_DIR = Path(__file__).parent / 'profiles'
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+_current: contextvars.ContextVar = contextvars.ContextVar('request_profile', default=None)
+_NULL_STAGE = contextlib.nullcontext()
+
+# tracemalloc is process-wide, so only one request is profiled at a time;
+# requests that arrive meanwhile simply run unprofiled.
+_profile_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self, label: str):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.stages = {}
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0})
+            entry['calls'] += 1
+            entry['wall_ms'] += (time.perf_counter() - wall_start) * 1000
+            entry['cpu_ms'] += (time.thread_time() - cpu_start) * 1000
+
+
+def stage(name: str):
+    """Time a pipeline stage if the current request is being profiled."""
+    profile = _current.get()
+    if profile is None:
+        return _NULL_STAGE
+    return profile.stage(name)
+
+
+def admin_token() -> str:
+    return os.getenv('PROFILE_ADMIN_TOKEN', '')
+
+
+def token_matches(header_value: Optional[str]) -> bool:
+    token = admin_token()
+    # Constant-time comparison, so the token cannot be guessed byte by byte
+    return bool(token) and header_value is not None and hmac.compare_digest(header_value, token)
+
+
+def max_kept() -> int:
+    return int(os.getenv('PROFILE_MAX_KEPT', '100'))
+
+
+def profile_dir() -> Path:
+    return Path(os.getenv('PROFILE_DIR', str(DEFAULT_PROFILE_DIR)))
+
+
+def requested(header_value: Optional[str]) -> bool:
+    if token_matches(header_value):
+        return True
+    rate = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    return rate > 0 and random.random() < rate
+
+
+def run_profiled(label: str, fn: Callable, *args) -> Tuple[object, Optional[str]]:
+    """Call fn(*args) under the profiler; returns (result, profile id or None).
+
+    Must run in the thread that does the work, since cProfile and
+    thread_time only see the calling thread.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return fn(*args), None
+
+    profile = RequestProfile(label)
+    token = _current.set(profile)
+    profiler = cProfile.Profile()
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    error = None
+    try:
+        profiler.enable()
+        try:
+            return fn(*args), profile.id
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            profiler.disable()
+    finally:
+        summary = {
+            'id': profile.id,
+            'label': label,
+            'created_at': time.time(),
+            'wall_ms': round((time.perf_counter() - wall_start) * 1000, 2),
+            'cpu_ms': round((time.thread_time() - cpu_start) * 1000, 2),
+            'peak_alloc_bytes': tracemalloc.get_traced_memory()[1],
+            'stages': {
+                name: {k: round(v, 2) for k, v in entry.items()}
+                for name, entry in profile.stages.items()
+            },
+            'error': error,
+        }
+        if started_tracemalloc:
+            tracemalloc.stop()
+        _current.reset(token)
+        _profile_lock.release()
+        _write_artifacts(profiler, summary)
+
+
+def _write_artifacts(profiler: cProfile.Profile, summary: dict) -> None:
+    try:
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+
+        stats_text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_text)
+        stats.sort_stats('cumulative').print_stats(25)
+        summary['top_functions'] = stats_text.getvalue()
+
+        profiler.dump_stats(str(directory / f"{summary['id']}.prof"))
+        with open(directory / f"{summary['id']}.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        _prune(directory)
+    except Exception as e:
+        print(f"Failed to write profile {summary['id']}: {e}")
+
+
+def _prune(directory: Path) -> None:
+    """Delete all but the newest max_kept() profiles."""
+    summaries = [p for p in directory.glob('*.json') if PROFILE_ID_PATTERN.match(p.stem)]
+    if len(summaries) <= max_kept():
+        return
+    summaries.sort(key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in summaries[max_kept():]:
+        for extension in ('json', 'prof'):
+            path.with_suffix(f'.{extension}').unlink(missing_ok=True)
+
+
+def artifact_path(profile_id: str, extension: str) -> Optional[Path]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = profile_dir() / f"{profile_id}.{extension}"
+    return path if path.exists() else None
@@ -0,0 +1,215 @@
+"""Latency- and error-aware routing across vision/OCR providers.
+
+Each provider keeps an exponentially weighted moving average (EWMA) of its
+latency, its error rate and its miss rate (calls that raised or whose answer
+was rejected, e.g. no names). Requests go to the provider with the lowest
+expected latency, where a provider that often fails or comes back empty is
+penalized and a provider that failed recently (or ran out of quota) sits out
+a cooldown before it is tried again ahead of the others.
+"""
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from deadline import Deadline
+
+LATENCY_ALPHA = 0.3
+ERROR_ALPHA = 0.2
+BASE_COOLDOWN_SECONDS = 5.0
+MAX_COOLDOWN_SECONDS = 300.0
+QUOTA_COOLDOWN_SECONDS = 60.0
+
+QUOTA_MARKERS = ('429', 'quota', 'rate limit', 'rate_limit', 'resource exhausted', 'resourceexhausted')
+TIMEOUT_MARKERS = ('timeout', 'timed out', 'deadline exceeded', 'deadlineexceeded')
+# A call that ran this share of its (shortened) timeout before failing is
+# treated as having timed out, whatever the SDK called the error
+TIMEOUT_ELAPSED_SHARE = 0.9
+
+
+class AllProvidersFailed(RuntimeError):
+    """Every provider that was tried raised, so "no names" is not an answer."""
+
+
+def is_quota_error(error: Exception) -> bool:
+    status = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+    if status == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in QUOTA_MARKERS)
+
+
+def is_timeout_error(error: Exception) -> bool:
+    if isinstance(error, TimeoutError):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in TIMEOUT_MARKERS)
+
+
+class Provider:
+    """A backend that turns an image into names.
+
+    `analyze` is called with the router's positional arguments and returns a
+    dict of results; `is_enabled` says whether the backend is configured.
+    `timeout` is the per-call timeout the provider uses when the request's
+    deadline does not cut it short.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        analyze: Callable[..., dict],
+        is_enabled: Callable[[], bool],
+        initial_latency: float,
+        resolve_urls: bool = False,
+        timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.analyze = analyze
+        self.is_enabled = is_enabled
+        self.resolve_urls = resolve_urls
+        self.timeout = timeout
+
+        self.ewma_latency = initial_latency
+        self.error_rate = 0.0
+        self.miss_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.quota_exhausted = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def expected_latency(self) -> float:
+        # A provider that fails or comes back empty half the time needs two
+        # tries on average to produce a usable answer
+        return self.ewma_latency / max(1.0 - self.miss_rate, 0.05)
+
+    def in_cooldown(self, now: float) -> bool:
+        return now < self.cooldown_until
+
+
+class ProviderRouter:
+    def __init__(self, providers: List[Provider]):
+        self.providers = providers
+        self._lock = threading.Lock()
+
+    def ranked(self) -> List[Provider]:
+        """Enabled providers, healthiest first; cooling-down ones go last."""
+        now = time.monotonic()
+        with self._lock:
+            enabled = [p for p in self.providers if p.is_enabled()]
+            return sorted(enabled, key=lambda p: (p.in_cooldown(now), p.expected_latency()))
+
+    def record_success(self, provider: Provider, elapsed: float, accepted: bool = True) -> None:
+        """Record a call that returned; `accepted` is False when its answer
+        was rejected, which counts against the provider's ranking but not its
+        health (no cooldown)."""
+        with self._lock:
+            provider.calls += 1
+            provider.ewma_latency += LATENCY_ALPHA * (elapsed - provider.ewma_latency)
+            provider.error_rate *= 1.0 - ERROR_ALPHA
+            if accepted:
+                provider.miss_rate *= 1.0 - ERROR_ALPHA
+            else:
+                provider.rejected += 1
+                provider.miss_rate += ERROR_ALPHA * (1.0 - provider.miss_rate)
+            provider.consecutive_failures = 0
+            provider.cooldown_until = 0.0
+            provider.quota_exhausted = False
+
+    def record_failure(self, provider: Provider, elapsed: float, error: Exception) -> None:
+        with self._lock:
+            provider.calls += 1
+            provider.failures += 1
+            # Failures still tell us how long the provider made us wait
+            provider.ewma_latency += LATENCY_ALPHA * (max(elapsed, provider.ewma_latency) - provider.ewma_latency)
+            provider.error_rate += ERROR_ALPHA * (1.0 - provider.error_rate)
+            provider.miss_rate += ERROR_ALPHA * (1.0 - provider.miss_rate)
+            provider.consecutive_failures += 1
+
+            if is_quota_error(error):
+                provider.quota_exhausted = True
+                cooldown = QUOTA_COOLDOWN_SECONDS
+            else:
+                cooldown = BASE_COOLDOWN_SECONDS * 2 ** (provider.consecutive_failures - 1)
+            provider.cooldown_until = time.monotonic() + min(cooldown, MAX_COOLDOWN_SECONDS)
+
+    def route(
+        self,
+        *args: Any,
+        accept: Callable[[dict], bool] = bool,
+        max_attempts: Optional[int] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Tuple[Optional[Provider], Optional[dict]]:
+        """Try providers best-first until one returns an accepted result.
+
+        Fallback providers are skipped once the deadline has passed, or when
+        they typically take longer than the time left. A call that timed out
+        because the deadline cut its timeout short, or that failed after the
+        deadline passed, is the request's budget running out, not the
+        provider misbehaving, so it is not held against the provider. Any
+        other error (auth, quota, bad request) is.
+
+        Returns (None, None) when no provider gave an accepted result, and
+        raises AllProvidersFailed when every provider tried raised.
+        """
+        errors = []
+        answered = False
+        for attempt, provider in enumerate(self.ranked()[:max_attempts]):
+            if attempt > 0 and deadline is not None:
+                if deadline.expired():
+                    print("Deadline reached, skipping remaining providers")
+                    break
+                if provider.ewma_latency > deadline.remaining():
+                    print(f"Skipping provider {provider.name}: usually takes longer than the time left")
+                    continue
+
+            cut_timeout = None
+            if deadline is not None and provider.timeout is not None and deadline.remaining() < provider.timeout:
+                cut_timeout = deadline.timeout(provider.timeout)
+            start = time.perf_counter()
+            try:
+                result = provider.analyze(*args)
+            except Exception as e:
+                elapsed = time.perf_counter() - start
+                errors.append(f"{provider.name}: {e}")
+                cut_short = cut_timeout is not None and (
+                    is_timeout_error(e) or elapsed >= TIMEOUT_ELAPSED_SHARE * cut_timeout
+                )
+                out_of_time = deadline is not None and deadline.expired()
+                if (cut_short or out_of_time) and not is_quota_error(e):
+                    print(f"Provider {provider.name} ran out of request time, not demoting: {e}")
+                    continue
+                self.record_failure(provider, elapsed, e)
+                print(f"Provider {provider.name} failed, demoting: {e}")
+                continue
+
+            accepted = accept(result)
+            self.record_success(provider, time.perf_counter() - start, accepted)
+            answered = True
+            if accepted:
+                return provider, result
+
+        if errors and not answered:
+            raise AllProvidersFailed("; ".join(errors))
+        return None, None
+
+    def snapshot(self) -> List[dict]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'name': p.name,
+                    'enabled': p.is_enabled(),
+                    'ewma_latency_ms': round(p.ewma_latency * 1000),
+                    'error_rate': round(p.error_rate, 3),
+                    'miss_rate': round(p.miss_rate, 3),
+                    'expected_latency_ms': round(p.expected_latency() * 1000),
+                    'cooldown_seconds': round(max(p.cooldown_until - now, 0.0), 1),
+                    'quota_exhausted': p.quota_exhausted,
+                    'calls': p.calls,
+                    'failures': p.failures,
+                    'rejected': p.rejected,
+                }
+                for p in self.providers
+            ]
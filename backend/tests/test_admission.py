@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from admission import AdmissionController, EndpointLimit
+
+
+def make_controller(total_slots=2, per_client_limit=2, queue_timeout=1.0, search_queue=4, ocr_queue=4):
+    return AdmissionController(
+        total_slots=total_slots,
+        per_client_limit=per_client_limit,
+        queue_timeout=queue_timeout,
+        limits=[
+            EndpointLimit('search', max_concurrent=2, max_queue=search_queue, priority=0, initial_service_time=1.0),
+            EndpointLimit('ocr', max_concurrent=2, max_queue=ocr_queue, priority=1, initial_service_time=5.0),
+        ],
+    )
+
+
+async def hold(controller, endpoint, client, release, order):
+    async with controller.admit(endpoint, client):
+        order.append((endpoint, client))
+        await release.wait()
+
+
+def test_search_is_admitted_before_earlier_queued_ocr():
+    async def scenario():
+        controller = make_controller(total_slots=1, per_client_limit=10)
+        order = []
+        release = asyncio.Event()
+        first = asyncio.create_task(hold(controller, 'ocr', 'a', release, order))
+        await asyncio.sleep(0)
+        queued_ocr = asyncio.create_task(hold(controller, 'ocr', 'b', release, order))
+        await asyncio.sleep(0)
+        queued_search = asyncio.create_task(hold(controller, 'search', 'c', release, order))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, queued_ocr, queued_search)
+        return order
+
+    assert asyncio.run(scenario()) == [('ocr', 'a'), ('search', 'c'), ('ocr', 'b')]
+
+
+def test_least_busy_client_goes_first_within_a_priority():
+    async def scenario():
+        controller = make_controller(total_slots=1, per_client_limit=10)
+        order = []
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(hold(controller, 'search', 'busy', release, order))]
+        await asyncio.sleep(0)
+        for client in ('busy', 'busy', 'quiet'):
+            tasks.append(asyncio.create_task(hold(controller, 'search', client, release, order)))
+            await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario())[1] == ('search', 'quiet')
+
+
+def test_per_client_limit_not_applied_while_idle():
+    async def scenario():
+        controller = make_controller(total_slots=4, per_client_limit=1)
+        async with controller.admit('search', 'a'):
+            async with controller.admit('search', 'a'):
+                return controller.total_active
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_per_client_limit_rejects_under_contention():
+    async def scenario():
+        controller = make_controller(total_slots=1, per_client_limit=1)
+        async with controller.admit('search', 'a'):
+            with pytest.raises(HTTPException) as excinfo:
+                async with controller.admit('search', 'a'):
+                    pass
+            return excinfo.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert int(error.headers['Retry-After']) >= 1
+
+
+def test_full_queue_is_rejected_with_503():
+    async def scenario():
+        controller = make_controller(total_slots=1, per_client_limit=10, ocr_queue=1)
+        release = asyncio.Event()
+        order = []
+        running = asyncio.create_task(hold(controller, 'ocr', 'a', release, order))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(hold(controller, 'ocr', 'b', release, order))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as excinfo:
+            async with controller.admit('ocr', 'c'):
+                pass
+        release.set()
+        await asyncio.gather(running, waiting)
+        return excinfo.value, controller
+
+    error, controller = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert 'Retry-After' in error.headers
+    assert controller.total_active == 0
+    assert controller.client_inflight == {}
+
+
+def test_queue_timeout_returns_503_and_frees_the_waiter():
+    async def scenario():
+        controller = make_controller(total_slots=1, per_client_limit=10, queue_timeout=0.05)
+        async with controller.admit('ocr', 'a'):
+            with pytest.raises(HTTPException) as excinfo:
+                async with controller.admit('ocr', 'b'):
+                    pass
+            queued = controller.limits['ocr'].queued
+        return excinfo.value, queued, controller
+
+    error, queued, controller = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert queued == 0
+    assert controller.limits['ocr'].timed_out == 1
+    assert controller.client_inflight == {}
@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def submit_all(batcher, items):
+    with ThreadPoolExecutor(max_workers=len(items)) as pool:
+        return list(pool.map(batcher.submit, items))
+
+
+def test_concurrent_items_share_one_batch():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    batcher = MicroBatcher(batch_fn, lambda item: pytest.fail('single call'), window=1.0, max_batch=4)
+    assert submit_all(batcher, [1, 2, 3, 4]) == [10, 20, 30, 40]
+    assert len(calls) == 1
+    assert batcher.snapshot()['avg_batch_size'] == 4
+
+
+def test_lone_item_uses_single_call():
+    batcher = MicroBatcher(lambda items: pytest.fail('batch call'), lambda item: item + 1, window=0.01, max_batch=4)
+    assert batcher.submit(1) == 2
+
+
+def test_failed_batch_falls_back_to_single_calls():
+    def batch_fn(items):
+        raise RuntimeError('upstream down')
+
+    batcher = MicroBatcher(batch_fn, lambda item: -item, window=1.0, max_batch=3)
+    assert submit_all(batcher, [1, 2, 3]) == [-1, -2, -3]
+    assert batcher.snapshot()['fallbacks'] == 1
+
+
+def test_fallback_single_calls_run_on_each_callers_thread():
+    running = []
+    overlap = threading.Barrier(3, timeout=5)
+
+    def batch_fn(items):
+        raise RuntimeError('upstream down')
+
+    def single_fn(item):
+        running.append(threading.get_ident())
+        overlap.wait()  # only passes if all three run at the same time
+        return item
+
+    batcher = MicroBatcher(batch_fn, single_fn, window=1.0, max_batch=3)
+    assert submit_all(batcher, [1, 2, 3]) == [1, 2, 3]
+    assert len(set(running)) == 3
+
+
+def test_unsplittable_batch_falls_back_to_single_calls():
+    batcher = MicroBatcher(lambda items: items[:1], lambda item: item, window=1.0, max_batch=2)
+    assert submit_all(batcher, ['a', 'b']) == ['a', 'b']
+    assert batcher.snapshot()['fallbacks'] == 1
+
+
+def test_single_call_error_reaches_its_caller():
+    def single_fn(item):
+        raise ValueError(item)
+
+    batcher = MicroBatcher(lambda items: [], single_fn, window=0.01, max_batch=4)
+    with pytest.raises(ValueError):
+        batcher.submit('bad')
+
+
+def test_follower_stops_waiting_after_timeout():
+    release = threading.Event()
+
+    def batch_fn(items):
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(batch_fn, lambda item: item, window=0.2, max_batch=3)
+    leader = threading.Thread(target=batcher.submit, args=('leader',))
+    leader.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.submit('follower', timeout=0.1)
+    finally:
+        release.set()
+        leader.join()
+    assert batcher.snapshot()['timeouts'] == 1
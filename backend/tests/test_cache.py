@@ -0,0 +1,69 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def shared(tmp_path):
+    return cache.SharedCache(str(tmp_path / 'cache.sqlite3'), ttl_seconds=60)
+
+
+def row_count(shared):
+    with sqlite3.connect(shared.path) as conn:
+        return conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+
+def test_round_trip(shared):
+    shared.set('lookup', 'companies:acme', {'url': 'u', 'names': ['a', 'b']})
+    assert shared.get('lookup', 'companies:acme') == {'url': 'u', 'names': ['a', 'b']}
+    assert shared.get('lookup', 'companies:other') is None
+    assert shared.get('image', 'companies:acme') is None
+    value, stored_at = shared.get_entry('lookup', 'companies:acme')
+    assert value['url'] == 'u' and stored_at > 0
+
+
+def test_expired_entries_are_not_returned_and_get_purged(shared):
+    shared.set('lookup', 'old', 1)
+    shared.ttl_seconds = -1
+    assert shared.get('lookup', 'old') is None
+    shared.purge_expired()
+    assert row_count(shared) == 0
+
+
+def test_writes_purge_periodically(shared, monkeypatch):
+    shared.set('lookup', 'old', 1)
+    shared.ttl_seconds = -1
+    monkeypatch.setattr(cache, 'PURGE_INTERVAL_SECONDS', 0.0)
+    shared.set('lookup', 'new', 2)
+    # The new row is expired too under a negative TTL; both are gone
+    assert row_count(shared) == 0
+
+
+def read_in_child(shared, queue):
+    queue.put(shared.get('lookup', 'parent'))
+    shared.set('lookup', 'child', 'from child')
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='needs fork')
+def test_entries_are_shared_across_forked_processes(shared):
+    shared.set('lookup', 'parent', 'from parent')
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    child = context.Process(target=read_in_child, args=(shared, queue))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    assert queue.get(timeout=5) == 'from parent'
+    assert shared.get('lookup', 'child') == 'from child'
+
+
+def test_disabled_cache_is_a_null_cache(monkeypatch):
+    monkeypatch.setenv('CACHE_ENABLED', 'false')
+    monkeypatch.setattr(cache, '_cache', None)
+    null = cache.get_cache()
+    assert isinstance(null, cache.NullCache)
+    null.set('lookup', 'k', 1)
+    assert null.get('lookup', 'k') is None
@@ -0,0 +1,54 @@
+import pytest
+
+from canonical import NameIndex, canonical_key, dedupe_names
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Mark Johnson', 'Mary Johnson'),
+    ('Jon Smith', 'John Smith'),
+    ('Daniel Lee', 'Danielle Lee'),
+    ('Alan Wang', 'Allan Wang'),
+])
+def test_similar_people_stay_apart(a, b):
+    index = NameIndex('people')
+    assert index.add(a) != index.add(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Dr. Jane Doe', 'Jane Doe'),
+    ('Jane Doe, PhD', 'jane doe'),
+    ('Doe Jane', 'Jane Doe'),
+    ('José García', 'Jose Garcia'),
+])
+def test_same_person_merges(a, b):
+    index = NameIndex('people')
+    assert index.add(a) == index.add(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Baskin-Robbins', 'Baskin Robbins'),
+    ('BaskinRobbins', 'Baskin Robbins'),
+    ('Acme Corp', 'ACME Corporation'),
+    ('Bridgestone Americas', 'Bridgest0ne Americas'),
+])
+def test_company_variants_merge(a, b):
+    index = NameIndex('companies')
+    assert index.add(a) == index.add(b)
+
+
+@pytest.mark.parametrize('a, b', [
+    ('Meta', 'Beta'),
+    ('Hulu', 'Hula'),
+])
+def test_short_company_names_stay_apart(a, b):
+    index = NameIndex('companies')
+    assert index.add(a) != index.add(b)
+
+
+def test_canonical_key_folds_ampersand_and_suffix():
+    assert canonical_key('AT&T Inc.', 'companies') == 'at and t'
+
+
+def test_dedupe_keeps_every_distinct_person():
+    names = ['Mark Johnson', 'Mary Johnson', 'Jon Smith', 'John Smith', 'Dr. Mark Johnson']
+    assert dedupe_names(names, 'people') == ['Mark Johnson', 'Mary Johnson', 'Jon Smith', 'John Smith']
@@ -0,0 +1,44 @@
+import time
+
+import pytest
+
+from deadline import MIN_STAGE_TIMEOUT, Deadline, deadline_from_header, stage_timeout
+
+
+@pytest.fixture(autouse=True)
+def default_limits(monkeypatch):
+    monkeypatch.setenv('REQUEST_DEADLINE_SECONDS', '30')
+    monkeypatch.setenv('REQUEST_DEADLINE_MAX_SECONDS', '120')
+
+
+@pytest.mark.parametrize('value', [None, '', 'soon', 'nan', 'NaN', 'inf', '-inf'])
+def test_missing_or_invalid_header_uses_default(value):
+    deadline = deadline_from_header(value)
+    assert deadline.budget == 30.0
+    assert not deadline.expired()
+    assert 29.0 < stage_timeout(deadline, 60.0) <= 30.0
+
+
+def test_header_sets_budget():
+    assert deadline_from_header('12.5').budget == 12.5
+
+
+def test_header_is_clamped():
+    assert deadline_from_header('1000').budget == 120.0
+    assert deadline_from_header('0').budget == MIN_STAGE_TIMEOUT
+    assert deadline_from_header('-5').budget == MIN_STAGE_TIMEOUT
+
+
+def test_stage_timeout_is_capped_and_floored():
+    deadline = Deadline(30.0)
+    assert stage_timeout(deadline, 10.0) == 10.0
+    assert stage_timeout(None, 10.0) == 10.0
+    deadline.expires_at = time.monotonic() - 1
+    assert deadline.expired()
+    assert deadline.remaining() == 0.0
+    assert stage_timeout(deadline, 10.0) == MIN_STAGE_TIMEOUT
+
+
+def test_reserve_leaves_time_for_later_stages():
+    deadline = Deadline(20.0)
+    assert stage_timeout(deadline, 60.0, reserve=5.0) <= 15.0
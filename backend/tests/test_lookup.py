@@ -0,0 +1,78 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import cache
+import main
+
+
+@pytest.fixture
+def searches(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, '_cache', cache.SharedCache(str(tmp_path / 'cache.sqlite3'), 86400))
+    state = {'calls': [], 'complete': True}
+
+    def fake_search(name, tag, deadline=None):
+        state['calls'].append(name)
+        return {'url': 'https://www.linkedin.com/company/att', 'isExact': True,
+                'title': f'{name} | LinkedIn', 'complete': state['complete']}
+
+    monkeypatch.setattr(main, 'search_linkedin_profile', fake_search)
+    return state
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def test_variant_is_searched_as_written_then_redirected(searches, client):
+    response = client.get('/api/lookup/companies/AT%26T%20Inc.', follow_redirects=False)
+    assert response.status_code == 308
+    assert response.headers['location'] == '/api/lookup/companies/at%20and%20t'
+    assert searches['calls'] == ['AT&T Inc.']
+
+    response = client.get(response.headers['location'])
+    assert response.status_code == 200
+    assert response.json()['name'] == 'at and t'
+    assert searches['calls'] == ['AT&T Inc.']
+
+
+def test_if_none_match_gets_304_with_same_etag(searches, client):
+    first = client.get('/api/lookup/companies/acme')
+    etag = first.headers['etag']
+    assert 'max-age=' in first.headers['cache-control']
+
+    second = client.get('/api/lookup/companies/acme', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['etag'] == etag
+    assert searches['calls'] == ['acme']
+
+
+def test_incomplete_result_is_not_stored_or_redirected(searches, client):
+    searches['complete'] = False
+    response = client.get('/api/lookup/companies/AT%26T', follow_redirects=False)
+    assert response.status_code == 200
+    assert response.headers['cache-control'] == 'no-store'
+    assert cache.get_cache().get('lookup', 'companies:at and t') is None
+
+
+def test_stale_canonical_entry_is_refreshed_with_display_name(searches, client, monkeypatch):
+    client.get('/api/lookup/companies/AT%26T', follow_redirects=False)
+    monkeypatch.setattr(main, 'LOOKUP_FRESH_SECONDS', -1)
+    monkeypatch.setattr(main, 'LOOKUP_MISS_FRESH_SECONDS', -1)
+
+    response = client.get('/api/lookup/companies/at%20and%20t')
+    assert response.status_code == 200
+    assert searches['calls'] == ['AT&T', 'AT&T']
+
+
+def test_name_with_slash_is_accepted(searches, client):
+    response = client.get('/api/lookup/companies/AC%2FDC', follow_redirects=False)
+    assert response.status_code == 308
+    assert response.headers['location'] == '/api/lookup/companies/ac%20dc'
+    assert searches['calls'] == ['AC/DC']
+
+
+def test_unknown_tag_is_rejected(searches, client):
+    assert client.get('/api/lookup/places/paris').status_code == 400
@@ -0,0 +1,40 @@
+import os
+
+import profiling
+
+
+def test_token_must_match_exactly(monkeypatch):
+    monkeypatch.setenv('PROFILE_ADMIN_TOKEN', 'secret')
+    assert profiling.token_matches('secret')
+    assert not profiling.token_matches('secre')
+    assert not profiling.token_matches(None)
+
+
+def test_no_token_configured_denies_everything(monkeypatch):
+    monkeypatch.setenv('PROFILE_ADMIN_TOKEN', '')
+    assert not profiling.token_matches('')
+
+
+def test_run_profiled_writes_artifacts(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    result, profile_id = profiling.run_profiled('test', sum, [1, 2, 3])
+    assert result == 6
+    assert profiling.artifact_path(profile_id, 'json') is not None
+    assert profiling.artifact_path(profile_id, 'prof') is not None
+
+
+def test_old_profiles_are_pruned(monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path))
+    monkeypatch.setenv('PROFILE_MAX_KEPT', '3')
+    ids = []
+    for i in range(5):
+        _, profile_id = profiling.run_profiled('test', sum, [i])
+        # Make the write order unambiguous for the mtime sort
+        for path in tmp_path.glob(f'{profile_id}.*'):
+            os.utime(path, (i, i))
+        ids.append(profile_id)
+    profiling._prune(tmp_path)
+
+    kept = {path.stem for path in tmp_path.glob('*.json')}
+    assert kept == set(ids[-3:])
+    assert {path.stem for path in tmp_path.glob('*.prof')} == kept
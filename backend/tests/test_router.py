@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from deadline import Deadline
+from router import AllProvidersFailed, Provider, ProviderRouter
+
+
+def failing(message):
+    def analyze(*args):
+        raise RuntimeError(message)
+    return analyze
+
+
+def test_failure_is_recorded_without_a_deadline():
+    provider = Provider('p', failing('boom'), lambda: True, initial_latency=1.0, timeout=60.0)
+    with pytest.raises(AllProvidersFailed):
+        ProviderRouter([provider]).route()
+    assert provider.failures == 1
+    assert provider.cooldown_until > time.monotonic()
+
+
+def test_timeout_cut_by_deadline_does_not_demote():
+    provider = Provider('p', failing('Request timed out'), lambda: True, initial_latency=1.0, timeout=60.0)
+    with pytest.raises(AllProvidersFailed):
+        ProviderRouter([provider]).route(deadline=Deadline(5.0))
+    assert provider.failures == 0
+    assert provider.error_rate == 0.0
+    assert provider.cooldown_until == 0.0
+
+
+def test_quota_error_demotes_even_under_a_short_deadline():
+    provider = Provider('p', failing('429 quota exceeded'), lambda: True, initial_latency=1.0, timeout=60.0)
+    with pytest.raises(AllProvidersFailed):
+        ProviderRouter([provider]).route(deadline=Deadline(5.0))
+    assert provider.failures == 1
+    assert provider.quota_exhausted
+
+
+def test_failure_with_full_budget_demotes():
+    provider = Provider('p', failing('boom'), lambda: True, initial_latency=1.0, timeout=10.0)
+    with pytest.raises(AllProvidersFailed):
+        ProviderRouter([provider]).route(deadline=Deadline(30.0))
+    assert provider.failures == 1
+
+
+def test_non_timeout_error_demotes_under_default_deadline():
+    # Production setup: 60s provider timeout, 30s default request deadline
+    provider = Provider('p', failing('401 API key not valid'), lambda: True, initial_latency=1.0, timeout=60.0)
+    router = ProviderRouter([provider])
+    for _ in range(3):
+        with pytest.raises(AllProvidersFailed):
+            router.route(deadline=Deadline(30.0))
+    assert provider.failures == 3
+    assert provider.error_rate > 0.0
+    assert provider.cooldown_until > time.monotonic()
+
+
+def test_timeout_exception_under_default_deadline_does_not_demote():
+    def analyze(*args):
+        raise TimeoutError()
+
+    provider = Provider('p', analyze, lambda: True, initial_latency=1.0, timeout=60.0)
+    with pytest.raises(AllProvidersFailed):
+        ProviderRouter([provider]).route(deadline=Deadline(30.0))
+    assert provider.failures == 0
+
+
+def test_failure_after_deadline_expired_does_not_demote():
+    deadline = Deadline(30.0)
+
+    def analyze(*args):
+        deadline.expires_at = time.monotonic() - 1
+        raise RuntimeError('connection reset')
+
+    provider = Provider('p', analyze, lambda: True, initial_latency=1.0, timeout=60.0)
+    with pytest.raises(AllProvidersFailed):
+        ProviderRouter([provider]).route(deadline=deadline)
+    assert provider.failures == 0
+
+
+def test_healthy_provider_is_ranked_first():
+    slow = Provider('slow', lambda: {'names': ['a']}, lambda: True, initial_latency=5.0)
+    fast = Provider('fast', lambda: {'names': ['b']}, lambda: True, initial_latency=1.0)
+    provider, result = ProviderRouter([slow, fast]).route()
+    assert provider is fast
+    assert result == {'names': ['b']}
+
+
+def test_every_provider_raising_is_an_error():
+    providers = [
+        Provider('a', failing('boom'), lambda: True, initial_latency=1.0),
+        Provider('b', failing('bang'), lambda: True, initial_latency=2.0),
+    ]
+    with pytest.raises(AllProvidersFailed, match='a: boom; b: bang'):
+        ProviderRouter(providers).route()
+
+
+def test_empty_answer_is_not_an_error():
+    providers = [
+        Provider('a', failing('boom'), lambda: True, initial_latency=1.0),
+        Provider('b', lambda: {'names': []}, lambda: True, initial_latency=2.0),
+    ]
+    assert ProviderRouter(providers).route(accept=lambda r: bool(r['names'])) == (None, None)
+
+
+def test_provider_returning_empty_answers_loses_its_rank():
+    empty = Provider('empty', lambda: {'names': []}, lambda: True, initial_latency=0.5)
+    useful = Provider('useful', lambda: {'names': ['Acme']}, lambda: True, initial_latency=3.0)
+    router = ProviderRouter([empty, useful])
+    for _ in range(10):
+        provider, _ = router.route(accept=lambda r: bool(r['names']))
+        assert provider is useful
+    assert router.ranked()[0] is useful
+    assert empty.rejected > 0
+    assert empty.cooldown_until == 0.0
@@ -0,0 +1,32 @@
+from PIL import Image, ImageDraw, ImageFont
+
+from triage import CHEAP, SKIP, triage_image
+
+
+def caption(background, ink, size=(1200, 800), font_size=30):
+    image = Image.new('RGB', size, background)
+    ImageDraw.Draw(image).text((40, 40), 'Jane Doe', fill=ink, font=ImageFont.load_default(size=font_size))
+    return image
+
+
+def test_blank_image_is_skipped():
+    assert triage_image(Image.new('RGB', (1200, 800), 'white'))['route'] == SKIP
+
+
+def test_tiny_image_is_skipped():
+    assert triage_image(Image.new('RGB', (16, 16), 'white'))['route'] == SKIP
+
+
+def test_small_dark_caption_is_not_skipped():
+    result = triage_image(caption('white', 'black'))
+    assert result['route'] != SKIP, result
+
+
+def test_faint_caption_is_not_skipped():
+    result = triage_image(caption((225, 225, 225), (180, 180, 180)))
+    assert result['route'] != SKIP, result
+
+
+def test_faint_caption_gets_a_cheap_attempt():
+    result = triage_image(caption((225, 225, 225), (205, 205, 205)))
+    assert result['route'] == CHEAP, result
@@ -0,0 +1,129 @@
+"""Cheap local pre-triage of uploaded images.
+
+Before any backend call, a downscaled grayscale copy of the image is checked
+for size, contrast, sharpness and edge density (a proxy for how much text or
+logo structure there is). Only images that are blank on every measure are
+answered locally; marginal ones get a single attempt on the best provider
+instead of the whole fallback chain.
+"""
+import os
+import threading
+import time
+
+from PIL import Image
+
+TRIAGE_SIZE = 256
+CONTRAST_TILE = 32
+
+SKIP = 'skip'
+CHEAP = 'cheap'
+FULL = 'full'
+
+
+def _threshold(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+def triage_image(image: Image.Image) -> dict:
+    """Classify an image as 'skip', 'cheap' or 'full' and report the metrics."""
+    import numpy as np
+
+    start = time.perf_counter()
+    width, height = image.size
+    metrics = {'width': width, 'height': height}
+
+    if min(width, height) < _threshold('TRIAGE_MIN_SIDE', '32'):
+        return _result(SKIP, 'too small', metrics, start)
+
+    # Box-reduce by an integer factor straight from the original (no
+    # full-resolution copy), then finish with a small thumbnail pass
+    factor = max(width, height) // TRIAGE_SIZE
+    small = image.reduce(factor) if factor > 1 else image.copy()
+    small.thumbnail((TRIAGE_SIZE, TRIAGE_SIZE))
+    gray = np.asarray(small.convert('L'), dtype=np.float32)
+
+    contrast = _local_contrast(gray, np)
+
+    # Sharpness: variance of the Laplacian, low for blurred images
+    laplacian = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4 * gray[1:-1, 1:-1]
+    )
+    sharpness = float(laplacian.var()) if laplacian.size else 0.0
+
+    # Text density: share of pixels sitting on a strong edge
+    gx = np.abs(np.diff(gray, axis=1))[:-1, :]
+    gy = np.abs(np.diff(gray, axis=0))[:, :-1]
+    edges = np.maximum(gx, gy) > 40
+    edge_density = float(edges.mean()) if edges.size else 0.0
+
+    metrics.update({
+        'contrast': round(contrast, 2),
+        'sharpness': round(sharpness, 2),
+        'edge_density': round(edge_density, 4),
+    })
+
+    low_contrast = contrast < _threshold('TRIAGE_MIN_CONTRAST', '8')
+    no_edges = edge_density < _threshold('TRIAGE_MIN_EDGE_DENSITY', '0.002')
+    if low_contrast and no_edges:
+        return _result(SKIP, 'blank', metrics, start)
+    if low_contrast or no_edges:
+        return _result(CHEAP, 'faint', metrics, start)
+    if sharpness < _threshold('TRIAGE_BLUR_SHARPNESS', '20'):
+        return _result(CHEAP, 'blurry', metrics, start)
+    if edge_density < _threshold('TRIAGE_SPARSE_EDGE_DENSITY', '0.01'):
+        return _result(CHEAP, 'sparse', metrics, start)
+    return _result(FULL, '', metrics, start)
+
+
+def _local_contrast(gray, np) -> float:
+    """Largest p99-p1 spread over any tile. A small caption on a plain
+    background barely moves the spread of the whole image, but it dominates
+    the tile it sits in."""
+    height, width = gray.shape
+    rows, cols = -(-height // CONTRAST_TILE), -(-width // CONTRAST_TILE)
+    # Pad to whole tiles with NaN (sorted last, so ignored), then sort every
+    # tile at once instead of calling np.percentile per tile
+    padded = np.full((rows * CONTRAST_TILE, cols * CONTRAST_TILE), np.nan, dtype=np.float32)
+    padded[:height, :width] = gray
+    tiles = padded.reshape(rows, CONTRAST_TILE, cols, CONTRAST_TILE).swapaxes(1, 2)
+    tiles = np.sort(tiles.reshape(rows * cols, -1), axis=1)
+    last = np.count_nonzero(~np.isnan(tiles), axis=1) - 1
+    index = np.arange(len(tiles))
+    low = tiles[index, np.floor(last * 0.01).astype(int)]
+    high = tiles[index, np.ceil(last * 0.99).astype(int)]
+    return float((high - low).max())
+
+
+def _result(route: str, reason: str, metrics: dict, start: float) -> dict:
+    return {
+        'route': route,
+        'reason': reason,
+        'metrics': metrics,
+        'elapsed_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+class TriageStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {SKIP: 0, CHEAP: 0, FULL: 0}
+        self.total_ms = 0.0
+
+    def record(self, result: dict) -> None:
+        with self._lock:
+            self.counts[result['route']] += 1
+            self.total_ms += result['elapsed_ms']
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = sum(self.counts.values())
+            return {
+                'images': total,
+                'routes': dict(self.counts),
+                'skip_rate': round(self.counts[SKIP] / total, 3) if total else 0.0,
+                'avg_ms': round(self.total_ms / total, 2) if total else 0.0,
+            }
+
+
+triage_stats = TriageStats()
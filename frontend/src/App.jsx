@@ -217,7 +217,8 @@ function App() {
 
       const data = await response.json()
       setExtractedNames(data.names)
-      setLinkedinUrls(data.linkedin_urls || {})
+      // A partial result may be missing URLs; let the search step look them up
+      setLinkedinUrls(data.partial ? {} : (data.linkedin_urls || {}))
       setStatusMessage(`Identified ${data.names.length} ${selectedTag === 'companies' ? 'compan' : 'person'}${data.names.length !== 1 ? (selectedTag === 'companies' ? 'ies' : 's') : (selectedTag === 'companies' ? 'y' : '')}`)
     } catch (error) {
       console.error('OCR Error:', error)
@@ -268,7 +269,7 @@ function App() {
         setResults(data.results)
         setPage('results')
         const exactMatches = data.results.filter(r => r.isExactMatch).length
-        setStatusMessage(`Found ${exactMatches} exact match${exactMatches !== 1 ? 'es' : ''} out of ${data.results.length} profiles`)
+        setStatusMessage(`Found ${exactMatches} exact match${exactMatches !== 1 ? 'es' : ''} out of ${data.results.length} profiles${data.partial ? ' (search incomplete for some names, try again)' : ''}`)
       }
     } catch (error) {
       console.error('Search Error:', error)
@@ -809,7 +810,7 @@ function App() {
                         <svg width="12" height="12" viewBox="0 0 24 24" fill="none" stroke="currentColor" strokeWidth="2">
                           <path d="M18 6L6 18M6 6l12 12"/>
                         </svg>
-                        No Match Found
+                        {result.complete === false ? 'Not Searched' : 'No Match Found'}
                       </>
                     )}
                   </div>